@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, Optional
+import threading
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class PrincipalCache:
+    """已认证用户缓存：user_id -> users 表行
+
+    get_current_user 命中时不再查库；User.save / delete_by_id 写入后按 user_id 失效。
+    只在当前 worker 进程内生效，其他进程的修改（如权限变更）最迟在 TTL 后可见。
+    缓存的是行数据而不是模型实例，每次请求各自构造实例，修改互不影响。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="principal")
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def generation(self) -> int:
+        """失效计数；查库前取一次，回填时比对，避免把失效前读到的旧行写回缓存"""
+        return self._generation
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._cache.get(user_id)
+
+    def store(self, user_id: int, row: Dict[str, Any], generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._cache.set(user_id, dict(row))
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.delete(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+# 创建全局用户缓存实例
+principal_cache = PrincipalCache(
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl,
+)
+
+
+def get_principal_cache() -> PrincipalCache:
+    """获取已认证用户缓存实例"""
+    return principal_cache
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+import threading
+import time
+
+
+class TTLCache:
+    """带过期时间和容量上限的 LRU 缓存（线程安全）
+
+    每个条目可以带若干标签，invalidate_tag 会删除带该标签的全部条目，
+    用于按航班、按表等维度精确失效。
+
+    查库回填前先取 generation()，set 时传入 since：读取期间若有同标签的失效（或 clear），
+    说明读到的可能是写入前的旧数据，本次回填被丢弃，避免旧数据在缓存中停留整个 TTL。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, name: str = "cache"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+        # 失效序号：标签 -> 最近一次失效的序号；记录数有上限，淘汰的最大序号记为下限
+        self._seq = 0
+        self._tag_seq: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._seq_floor = 0
+        self._max_tag_seq = max(1024, maxsize)
+
+    def generation(self) -> int:
+        """当前失效序号，查库前获取，回填时作为 set 的 since 参数"""
+        return self._seq
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[Hashable] = (),
+            since: Optional[int] = None) -> bool:
+        """写入条目；传入 since 且读取期间有相关失效时不写入，返回是否写入"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = tuple(tags)
+        with self._lock:
+            if since is not None and self._is_stale(tags, since):
+                self.stale_fills += 1
+                return False
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """删除带有该标签的全部条目，返回删除数量"""
+        with self._lock:
+            self._seq += 1
+            self._tag_seq[tag] = self._seq
+            self._tag_seq.move_to_end(tag)
+            while len(self._tag_seq) > self._max_tag_seq:
+                _, seq = self._tag_seq.popitem(last=False)
+                self._seq_floor = max(self._seq_floor, seq)
+            keys = self._tags.pop(tag, ())
+            for key in list(keys):
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seq += 1
+            self._seq_floor = self._seq
+            self._tag_seq.clear()
+            self._data.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _is_stale(self, tags: Tuple[Hashable, ...], since: int) -> bool:
+        """since 之后是否有相关失效，调用方需持有锁"""
+        if since < self._seq_floor:
+            return True
+        return any(self._tag_seq.get(tag, 0) > since for tag in tags)
+
+    def _remove(self, key: Hashable) -> None:
+        """删除条目并清理标签索引，调用方需持有锁"""
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
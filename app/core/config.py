@@ -23,6 +23,23 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # 认证用户缓存配置
+    principal_cache_size: int = 10000
+    principal_cache_ttl: int = 30  # 秒，其他进程的用户修改最迟在该时间后生效
+    token_cache_size: int = 10000  # 已验证令牌缓存条数，条目随令牌过期
+    
+    # 令牌吊销配置
+    token_revocation_sync_interval: int = 5  # 同步其他进程吊销记录的间隔（秒），0 表示不同步
+    token_revocation_prune_interval: int = 600  # 清理过期吊销记录的间隔（秒）
+    token_revocation_capacity: int = 100000  # 布隆过滤器预期容量，超出时自动扩容
+    
+    # 密码哈希配置（scrypt，在进程池中计算）
+    password_hash_workers: int = 2  # 每个 worker 进程的哈希子进程数
+    password_hash_max_pending: int = 64  # 排队上限，超过时登录/注册返回 503
+    password_hash_n: int = 16384  # scrypt 代价参数，调整后旧哈希在下次登录时自动升级
+    password_hash_r: int = 8
+    password_hash_p: int = 1
+    
     # CORS配置
     allowed_origins: list = [
         "http://localhost:3000",
@@ -35,6 +52,19 @@ class Settings(BaseSettings):
     upload_dir: str = "uploads"
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     
+    # 航班搜索缓存配置
+    flight_search_cache_size: int = 2048
+    flight_search_cache_ttl: int = 30  # 秒
+    
+    # ID 生成配置（Snowflake）
+    id_node_id: int = 0  # 主机节点号 0~31，多机部署时每台主机不同
+    id_worker_id: Optional[int] = None  # 进程槽位 0~31，不设置时按本机文件锁自动分配
+    
+    # 未支付订单过期配置
+    order_hold_minutes: int = 30  # 未支付订单的座位保留时长
+    order_expiry_interval: int = 60  # 过期检查间隔（秒），0 表示不启动
+    order_expiry_batch_size: int = 200  # 每个事务处理的订单数
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+from typing import Dict, Optional, Tuple
+import logging
+import os
+import tempfile
+import threading
+import time
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 起始时间 2025-01-01 00:00:00 UTC（毫秒），41 位时间戳可用约 69 年
+EPOCH_MS = 1735689600000
+NODE_BITS = 5
+WORKER_BITS = 5
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# 逻辑时间最多领先系统时钟的毫秒数（时钟回拨或序号用尽时借用），超过则报错
+MAX_CLOCK_BACKWARD_MS = 1000
+
+
+class SnowflakeGenerator:
+    """Snowflake 风格的 64 位ID：毫秒时间戳(41) | 节点(5) | 进程槽位(5) | 序号(12)
+
+    同一进程内单调递增（线程安全），从不休眠：时钟回拨或同一毫秒内序号用尽时，
+    沿用上次的时间戳并向后借用毫秒，直到系统时钟追上。
+    节点号区分主机，进程槽位区分同一主机上的 worker 进程。
+    """
+
+    def __init__(self, node_id: int, worker_id: int, epoch_ms: int = EPOCH_MS):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"节点号必须在 0~{MAX_NODE_ID} 之间")
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"进程槽位必须在 0~{MAX_WORKER_ID} 之间")
+        self.node_id = node_id
+        self.worker_id = worker_id
+        self.epoch_ms = epoch_ms
+        self._prefix = (node_id << (WORKER_BITS + SEQUENCE_BITS)) | (worker_id << SEQUENCE_BITS)
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _now_ms(self) -> int:
+        return time.time_ns() // 1_000_000 - self.epoch_ms
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = self._now_ms()
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                if self._last_ms - now > MAX_CLOCK_BACKWARD_MS:
+                    raise RuntimeError(f"系统时钟回拨 {self._last_ms - now}ms，拒绝生成ID")
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    self._last_ms += 1
+            return (self._last_ms << (NODE_BITS + WORKER_BITS + SEQUENCE_BITS)) | self._prefix | self._sequence
+
+    def parse(self, value: int) -> Dict[str, int]:
+        """拆解ID各部分（排查问题用）"""
+        return {
+            "timestamp_ms": (value >> (NODE_BITS + WORKER_BITS + SEQUENCE_BITS)) + self.epoch_ms,
+            "node_id": (value >> (WORKER_BITS + SEQUENCE_BITS)) & MAX_NODE_ID,
+            "worker_id": (value >> SEQUENCE_BITS) & MAX_WORKER_ID,
+            "sequence": value & MAX_SEQUENCE,
+        }
+
+
+def _claim_worker_slot(node_id: int) -> Tuple[int, Optional[object]]:
+    """在本机上为当前进程占用一个槽位
+
+    用排他文件锁实现，进程退出后锁自动释放；同一主机的多个 uvicorn worker 拿到不同槽位。
+    不支持文件锁的平台退回到 pid 取模（多进程部署时请显式配置 id_worker_id）。
+    """
+    if fcntl is None:
+        return os.getpid() & MAX_WORKER_ID, None
+    lock_dir = os.path.join(tempfile.gettempdir(), "ticket-service-idgen")
+    os.makedirs(lock_dir, exist_ok=True)
+    for slot in range(MAX_WORKER_ID + 1):
+        handle = open(os.path.join(lock_dir, f"{node_id}-{slot}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        return slot, handle
+    raise RuntimeError(f"本机 ID 槽位已用尽（最多 {MAX_WORKER_ID + 1} 个进程）")
+
+
+_generator: Optional[SnowflakeGenerator] = None
+_generator_pid: Optional[int] = None
+_slot_handle: Optional[object] = None
+_init_lock = threading.Lock()
+
+
+def get_id_generator() -> SnowflakeGenerator:
+    """获取当前进程的ID生成器（按进程懒加载，fork 出的子进程会重新占用槽位）"""
+    global _generator, _generator_pid, _slot_handle
+    pid = os.getpid()
+    if _generator is None or _generator_pid != pid:
+        with _init_lock:
+            if _generator is None or _generator_pid != pid:
+                if settings.id_worker_id is not None:
+                    worker_id, handle = settings.id_worker_id, None
+                else:
+                    worker_id, handle = _claim_worker_slot(settings.id_node_id)
+                _generator = SnowflakeGenerator(settings.id_node_id, worker_id)
+                _slot_handle = handle
+                _generator_pid = pid
+                logger.info(f"ID生成器已初始化: 节点 {settings.id_node_id}, 槽位 {worker_id}")
+    return _generator
+
+
+def next_id() -> int:
+    """生成一个新ID"""
+    return get_id_generator().next_id()
+
+
+def new_order_number() -> str:
+    """生成订单号：ORD + 19 位定长ID，字典序与生成顺序一致"""
+    return f"ORD{next_id():019d}"
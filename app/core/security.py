@@ -1,17 +1,26 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
+import hashlib
+import time
+import uuid
 import jwt
-from fastapi import HTTPException, status
+from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.database.session import UnitOfWork, get_session
+from app.core.auth_cache import get_principal_cache
+from app.core.cache import TTLCache
+from app.services.token_revocation import get_token_revocation
+from app.services.password_hasher import get_password_hasher
 
-# 明文密码存储和比对
+# 密码哈希在进程池中计算（scrypt），历史明文密码仍可校验
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return plain_password == hashed_password
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    matched, _ = await get_password_hasher().verify(plain_password, hashed_password)
+    return matched
 
-def get_password_hash(password: str) -> str:
-    return password
+async def get_password_hash(password: str) -> str:
+    return await get_password_hasher().hash(password)
 
 # JWT配置
 from app.core.config import settings
@@ -23,6 +32,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 # HTTP Bearer认证
 security = HTTPBearer()
 
+# 已验证令牌缓存：令牌摘要 -> 声明，条目随令牌的 exp 一起过期；验证失败的令牌不缓存
+token_cache = TTLCache(maxsize=settings.token_cache_size, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60, name="token")
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -30,37 +42,90 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[dict]:
+    """验证令牌并返回声明；同一令牌在有效期内只做一次签名校验"""
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return dict(claims)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         if username is None or user_id is None:
             return None
-        return {"username": username, "user_id": user_id}
+        claims = {"username": username, "user_id": user_id, "jti": payload.get("jti"), "exp": payload.get("exp")}
     except jwt.PyJWTError:
         return None
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.set(digest, claims, ttl=min(remaining, token_cache.ttl))
+    return dict(claims)
+
+def get_token_cache_stats() -> dict:
+    """令牌缓存命中统计"""
+    return token_cache.stats()
+
+class TokenPrincipal(NamedTuple):
+    """只含令牌声明的当前用户（不查库）"""
+    id: int
+    username: str
+    jti: Optional[str] = None
+    expires_at: Optional[float] = None
+
+def _credentials_exception(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = security):
-    token = credentials.credentials
-    payload = verify_token(token)
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = verify_token(credentials.credentials)
     if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_exception("无效的认证凭据")
+    # 吊销检查只查内存；没有 jti 的旧令牌无法吊销，只能等待过期
+    jti = payload.get("jti")
+    if jti is not None and get_token_revocation().is_revoked(jti):
+        raise _credentials_exception("令牌已失效，请重新登录")
+    return payload
+
+async def get_current_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> TokenPrincipal:
+    """仅校验令牌，返回令牌中的用户ID和用户名，不访问数据库
+
+    适用于只需要 current_user.id 的接口；令牌有效期内用户被删除或改权限不会被察觉，
+    需要完整用户信息或权限判断的接口使用 get_current_user。
+    """
+    payload = _decode_credentials(credentials)
+    return TokenPrincipal(
+        id=payload["user_id"], username=payload["username"],
+        jti=payload["jti"], expires_at=payload["exp"]
+    )
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session: UnitOfWork = Depends(get_session)
+):
+    payload = _decode_credentials(credentials)
     from app.database.models import User
-    user = User.get_by_username(payload["username"])
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    principal_cache = get_principal_cache()
+    user_id = payload["user_id"]
+    row = principal_cache.get(user_id)
+    if row is not None:
+        user = User.from_row(row)
+    else:
+        generation = principal_cache.generation()
+        user = await User.get_by_id_async(user_id, session=session)
+        if user is not None:
+            principal_cache.store(user_id, user.to_dict(), generation)
+    if user is None or user.username != payload["username"]:
+        raise _credentials_exception("用户不存在")
     return user
 
 def create_user_token(user_id: int, username: str) -> str:
@@ -68,4 +133,12 @@ def create_user_token(user_id: int, username: str) -> str:
     return create_access_token(
         data={"sub": username, "user_id": user_id}, 
         expires_delta=access_token_expires
-    ) 
\ No newline at end of file
+    ) 
+
+async def get_current_admin(current_user=Depends(get_current_user)):
+    if current_user.user_type != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return current_user
@@ -1,8 +1,13 @@
 from .config import settings, get_database_config, get_database_url
-from .connection import get_db_connection, test_database_connection, get_database_info
+from .connection import (
+    get_db_connection, test_database_connection, get_database_info,
+    close_database_connections, PoolTimeoutError
+)
 from .database import get_database, Database
+from .async_database import get_async_database, AsyncDatabase
+from .session import UnitOfWork, get_session
 from .models import (
-    BaseModel, User, Aircraft, Route, Flight, 
+    BaseModel, BatchLoader, ConcurrentUpdateError, User, Aircraft, Route, Flight, 
     Order, OrderPassenger, Notice
 )
 
@@ -16,13 +21,21 @@ __all__ = [
     'get_db_connection',
     'test_database_connection',
     'get_database_info',
+    'close_database_connections',
+    'PoolTimeoutError',
     
     # 数据库操作
     'get_database',
     'Database',
+    'get_async_database',
+    'AsyncDatabase',
+    'UnitOfWork',
+    'get_session',
     
     # 模型
     'BaseModel',
+    'BatchLoader',
+    'ConcurrentUpdateError',
     'User',
     'Aircraft',
     'Route',
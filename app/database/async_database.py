@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/18 下午3:05
+# @File    : async_database.py
+# @Software: PyCharm
+
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Callable
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import aiomysql
+from .config import get_database_config
+from .connection import PoolTimeoutError
+from .query_stats import query_stats
+from .query_cache import query_cache, is_miss, table_written
+from .database import build_keyset_query, split_page, iter_bulk_insert
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """异步数据库操作类（基于 aiomysql，接口与 Database 保持一致）"""
+
+    # 是否处于调用方管理的事务中（工作单元开启事务后为 True）
+    _in_transaction = False
+
+    def __init__(self):
+        self.config = get_database_config()
+        self._pool: Optional[aiomysql.Pool] = None
+        # 在 init_pool 中按需创建：Python 3.10 以前 Lock 会绑定创建时的事件循环
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._auto_increment_step: Optional[int] = None
+
+    async def init_pool(self) -> aiomysql.Pool:
+        """创建异步连接池（已创建则直接返回）"""
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        host=self.config["host"],
+                        port=self.config["port"],
+                        user=self.config["user"],
+                        password=self.config["password"],
+                        db=self.config["database"],
+                        charset=self.config["charset"],
+                        autocommit=self.config["autocommit"],
+                        cursorclass=aiomysql.DictCursor,
+                        minsize=1,
+                        maxsize=self.config["pool_size"] + self.config["max_overflow"],
+                        pool_recycle=self.config["pool_recycle"],
+                        connect_timeout=10,
+                    )
+        return self._pool
+
+    async def close(self) -> None:
+        """关闭异步连接池"""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncIterator[aiomysql.Connection]:
+        """从异步连接池取出连接的上下文管理器，退出时归还"""
+        pool = await self.init_pool()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=self.config["pool_timeout"])
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(f"等待数据库连接超时({self.config['pool_timeout']}s)")
+        try:
+            if self.config["pool_pre_ping"]:
+                await conn.ping(reconnect=True)
+            yield conn
+        except Exception as e:
+            logger.error(f"数据库操作失败: {e}")
+            try:
+                await conn.rollback()
+            except Exception:
+                # 已关闭的连接归还时会被连接池丢弃
+                conn.close()
+            raise
+        finally:
+            await pool.release(conn)
+
+    async def _get_auto_increment_step(self, cursor: aiomysql.Cursor) -> int:
+        """auto_increment_increment（首次批量插入时读取一次）"""
+        if self._auto_increment_step is None:
+            await cursor.execute("SELECT @@auto_increment_increment AS step")
+            self._auto_increment_step = int((await cursor.fetchone())["step"])
+        return self._auto_increment_step
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """注册提交后回调；自动提交模式下语句已生效，立即执行"""
+        callback()
+
+    def _cache_readable(self) -> bool:
+        """当前是否可以读取查询缓存"""
+        return True
+
+    def _cache_storable(self) -> bool:
+        """当前查询的结果是否可以写入查询缓存（在执行查询前判断）"""
+        return True
+
+    def _invalidate(self, table: str) -> None:
+        """写入表后使该表的查询缓存失效"""
+        query_cache.invalidate_table(table)
+
+    async def execute_query(self, query: str, params: Optional[Tuple] = None, cache: bool = False) -> List[Dict[str, Any]]:
+        """执行查询语句，返回所有结果
+
+        cache=True 时结果进入查询缓存，涉及的表有写入时失效。
+        """
+        key = None
+        if cache and self._cache_readable():
+            key, cached = query_cache.lookup(query, params)
+            if not is_miss(cached):
+                return cached
+            if not self._cache_storable():
+                key = None
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    with query_stats.track(query, params) as timer:
+                        await cursor.execute(query, params)
+                        rows = list(await cursor.fetchall())
+                        timer.rows = len(rows)
+                    return query_cache.store(key, query, rows)
+        except Exception as e:
+            logger.error(f"查询执行失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+
+    async def execute_one(self, query: str, params: Optional[Tuple] = None, cache: bool = False) -> Optional[Dict[str, Any]]:
+        """执行查询语句，返回单条记录（cache 含义同 execute_query）"""
+        key = None
+        if cache and self._cache_readable():
+            key, cached = query_cache.lookup(query, params)
+            if not is_miss(cached):
+                return cached
+            if not self._cache_storable():
+                key = None
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    with query_stats.track(query, params) as timer:
+                        await cursor.execute(query, params)
+                        row = await cursor.fetchone()
+                        timer.rows = 1 if row else 0
+                    return query_cache.store(key, query, row)
+        except Exception as e:
+            logger.error(f"查询执行失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+
+    async def stream_query(self, query: str, params: Optional[Tuple] = None, batch_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式查询，使用服务端游标（不缓冲结果集）逐批返回记录
+
+        迭代期间独占一条连接；未迭代完就中止（如客户端断开）时关闭该连接，由连接池丢弃。
+        """
+        try:
+            async with self.get_connection() as conn:
+                cursor = await conn.cursor(aiomysql.SSDictCursor)
+                finished = False
+                try:
+                    with query_stats.track(query, params):
+                        await cursor.execute(query, params)
+                    while True:
+                        rows = await cursor.fetchmany(batch_size)
+                        if not rows:
+                            finished = True
+                            break
+                        yield rows
+                finally:
+                    if finished:
+                        await cursor.close()
+                    else:
+                        # 未读完的结果集会阻塞连接，直接关闭比读完剩余数据更快
+                        conn.close()
+        except Exception as e:
+            logger.error(f"流式查询失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+
+    async def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
+        """执行更新语句，返回影响的行数"""
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    with query_stats.track(query, params) as timer:
+                        timer.rows = await cursor.execute(query, params)
+        except Exception as e:
+            logger.error(f"更新执行失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+        self._invalidate(table_written(query))
+        return timer.rows
+
+    async def execute_insert(self, query: str, params: Optional[Tuple] = None) -> int:
+        """执行插入语句，返回插入的ID"""
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    with query_stats.track(query, params) as timer:
+                        timer.rows = await cursor.execute(query, params)
+                    last_id = cursor.lastrowid
+        except Exception as e:
+            logger.error(f"插入执行失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+        self._invalidate(table_written(query))
+        return last_id
+
+    async def execute_many(self, query: str, params_list: List[Tuple]) -> int:
+        """批量执行SQL语句"""
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    with query_stats.track(query) as timer:
+                        timer.rows = await cursor.executemany(query, params_list)
+        except Exception as e:
+            logger.error(f"批量执行失败: {e}, SQL: {query}")
+            raise
+        self._invalidate(table_written(query))
+        return timer.rows
+
+    async def count(self, table: str, where: Optional[str] = None, params: Optional[Tuple] = None) -> int:
+        """获取表中记录数量"""
+        query = f"SELECT COUNT(*) as count FROM {table}"
+        if where:
+            query += f" WHERE {where}"
+
+        result = await self.execute_one(query, params)
+        return result["count"] if result else 0
+
+    async def exists(self, table: str, where: str, params: Optional[Tuple] = None) -> bool:
+        """检查记录是否存在"""
+        query = f"SELECT 1 FROM {table} WHERE {where} LIMIT 1"
+        result = await self.execute_one(query, params)
+        return result is not None
+
+    async def get_by_id(self, table: str, id_value: Any, id_field: str = "id", cache: bool = False) -> Optional[Dict[str, Any]]:
+        """根据ID获取记录"""
+        query = f"SELECT * FROM {table} WHERE {id_field} = %s"
+        return await self.execute_one(query, (id_value,), cache=cache)
+
+    async def get_all(self, table: str, order_by: Optional[str] = None, limit: Optional[int] = None, cache: bool = False) -> List[Dict[str, Any]]:
+        """获取表中所有记录"""
+        query = f"SELECT * FROM {table}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit:
+            query += f" LIMIT {limit}"
+
+        return await self.execute_query(query, cache=cache)
+
+    async def paginate(
+        self,
+        select: str,
+        sort_field: str,
+        id_field: str,
+        where: Optional[str] = None,
+        params: Optional[Tuple] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = True,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """游标分页查询，返回 (本页记录, 下一页游标)"""
+        query, all_params = build_keyset_query(
+            select, where, params, sort_field, id_field, cursor, limit, descending, offset
+        )
+        rows = await self.execute_query(query, all_params)
+        return split_page(rows, limit, sort_field.split(".")[-1], id_field.split(".")[-1])
+
+    async def insert(self, table: str, data: Dict[str, Any]) -> int:
+        """插入记录"""
+        fields = list(data.keys())
+        placeholders = ", ".join(["%s"] * len(fields))
+        field_names = ", ".join(fields)
+
+        query = f"INSERT INTO {table} ({field_names}) VALUES ({placeholders})"
+        return await self.execute_insert(query, tuple(data.values()))
+
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> List[int]:
+        """批量插入记录，返回按行顺序排列的自增ID（规则同 Database.insert_many）
+
+        在工作单元中调用时并入其事务，否则自行开启事务。
+        """
+        if not rows:
+            return []
+        ids: List[int] = []
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    step = await self._get_auto_increment_step(cursor)
+                    own_transaction = not self._in_transaction
+                    if own_transaction:
+                        await conn.begin()
+                    for query, params, count in iter_bulk_insert(
+                        cursor, table, rows,
+                        self.config["max_allowed_packet"], self.config["bulk_insert_max_rows"]
+                    ):
+                        with query_stats.track(query, params) as timer:
+                            timer.rows = await cursor.execute(query, params)
+                        ids.extend(range(cursor.lastrowid, cursor.lastrowid + count * step, step))
+                if own_transaction:
+                    await conn.commit()
+        except Exception as e:
+            logger.error(f"批量插入失败: {e}, 表: {table}, 行数: {len(rows)}")
+            raise
+        self._invalidate(table)
+        return ids
+
+    async def update(self, table: str, data: Dict[str, Any], where: str, params: Optional[Tuple] = None) -> int:
+        """更新记录"""
+        set_clause = ", ".join([f"{field} = %s" for field in data.keys()])
+        query = f"UPDATE {table} SET {set_clause} WHERE {where}"
+
+        update_params = tuple(data.values())
+        all_params = update_params + params if params else update_params
+
+        return await self.execute_update(query, all_params)
+
+    async def delete(self, table: str, where: str, params: Optional[Tuple] = None) -> int:
+        """删除记录"""
+        query = f"DELETE FROM {table} WHERE {where}"
+        return await self.execute_update(query, params)
+
+    async def delete_by_id(self, table: str, id_value: Any, id_field: str = "id") -> int:
+        """根据ID删除记录"""
+        return await self.delete(table, f"{id_field} = %s", (id_value,))
+
+
+# 创建全局异步数据库实例
+async_db = AsyncDatabase()
+
+
+def get_async_database() -> AsyncDatabase:
+    """获取异步数据库实例"""
+    return async_db
+
+
+async def init_async_database() -> None:
+    """初始化异步连接池"""
+    await async_db.init_pool()
+
+
+async def close_async_database() -> None:
+    """关闭异步连接池"""
+    await async_db.close()
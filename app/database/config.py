@@ -25,6 +25,22 @@ class DatabaseSettings(BaseSettings):
     database_max_overflow: int = 20
     database_pool_timeout: int = 30
     database_pool_recycle: int = 3600
+    database_pool_pre_ping: bool = True  # 取出连接前先 ping 一次
+    
+    # 批量写入配置
+    database_max_allowed_packet: int = 4 * 1024 * 1024  # 不超过服务端 max_allowed_packet
+    database_bulk_insert_max_rows: int = 1000  # 单条 INSERT 语句的最大行数
+    
+    # 查询统计配置
+    database_query_stats_enabled: bool = True
+    database_slow_query_ms: int = 200  # 超过该耗时（毫秒）的查询写入慢查询日志
+    database_query_stats_max_fingerprints: int = 500  # 最多统计的语句指纹数
+    
+    # 缓存配置
+    database_reference_refresh_interval: int = 300  # 航线/机型缓存刷新间隔（秒），0 表示不定时刷新
+    database_query_cache_enabled: bool = True  # 查询结果缓存（只作用于传入 cache=True 的查询）
+    database_query_cache_size: int = 4096
+    database_query_cache_ttl: int = 60  # 秒，其他进程写入后最长的可见延迟
     
     # 其他配置
     database_echo: bool = False  # 是否打印SQL语句
@@ -91,4 +107,17 @@ def get_database_config() -> dict:
         "charset": settings.database.database_charset,
         "autocommit": settings.database.database_autocommit,
         "echo": settings.database.database_echo,
+        "pool_size": settings.database.database_pool_size,
+        "max_overflow": settings.database.database_max_overflow,
+        "pool_timeout": settings.database.database_pool_timeout,
+        "pool_recycle": settings.database.database_pool_recycle,
+        "pool_pre_ping": settings.database.database_pool_pre_ping,
+        "max_allowed_packet": settings.database.database_max_allowed_packet,
+        "bulk_insert_max_rows": settings.database.database_bulk_insert_max_rows,
+        "query_cache_enabled": settings.database.database_query_cache_enabled,
+        "query_cache_size": settings.database.database_query_cache_size,
+        "query_cache_ttl": settings.database.database_query_cache_ttl,
+        "query_stats_enabled": settings.database.database_query_stats_enabled,
+        "slow_query_ms": settings.database.database_slow_query_ms,
+        "query_stats_max_fingerprints": settings.database.database_query_stats_max_fingerprints,
     } 
\ No newline at end of file
@@ -7,21 +7,165 @@
 import pymysql
 from pymysql.cursors import DictCursor
 from contextlib import contextmanager
-from typing import Optional, Generator
+from collections import deque
+from typing import Optional, Generator, Callable, Dict, Any
+import threading
+import time
 import logging
 from .config import get_database_config
 
 logger = logging.getLogger(__name__)
 
 
+class PoolTimeoutError(Exception):
+    """等待空闲连接超时"""
+
+
+class _ConnectionRecord:
+    """连接池中的一条连接记录"""
+
+    __slots__ = ("connection", "created_at")
+
+    def __init__(self, connection: pymysql.Connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """有界数据库连接池
+
+    常驻 pool_size 条连接，高峰期最多再临时创建 max_overflow 条溢出连接，
+    溢出连接归还时直接关闭。连接数达到上限时，取连接的线程最多等待
+    timeout 秒；超过 recycle 秒的连接会被重建，取出前可选先 ping 一次。
+    """
+
+    def __init__(
+        self,
+        creator: Callable[[], pymysql.Connection],
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        timeout: float = 30,
+        recycle: int = 3600,
+        pre_ping: bool = True,
+    ):
+        self._creator = creator
+        self._pool_size = pool_size
+        self._max_overflow = max_overflow
+        self._timeout = timeout
+        self._recycle = recycle
+        self._pre_ping = pre_ping
+        self._idle = deque()
+        self._total = 0
+        self._cond = threading.Condition()
+
+    def checkout(self) -> _ConnectionRecord:
+        """取出一条可用连接"""
+        deadline = time.monotonic() + self._timeout
+        record = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    # 后进先出，优先复用最近归还的连接
+                    record = self._idle.pop()
+                    break
+                if self._total < self._pool_size + self._max_overflow:
+                    self._total += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"等待数据库连接超时({self._timeout}s)，"
+                        f"连接池已满: {self._pool_size} + {self._max_overflow}"
+                    )
+                self._cond.wait(remaining)
+
+        if record is None:
+            return self._create_record()
+        if self._recycle > 0 and time.monotonic() - record.created_at > self._recycle:
+            return self._replace(record)
+        if self._pre_ping and not self._ping(record.connection):
+            return self._replace(record)
+        return record
+
+    def checkin(self, record: _ConnectionRecord, discard: bool = False) -> None:
+        """归还连接；discard 为 True、连接已关闭或池已满时关闭该连接"""
+        with self._cond:
+            if discard or not record.connection.open or len(self._idle) >= self._pool_size:
+                self._total -= 1
+                keep = False
+            else:
+                self._idle.append(record)
+                keep = True
+            self._cond.notify()
+        if not keep:
+            self._close(record.connection)
+
+    def dispose(self) -> None:
+        """关闭所有空闲连接"""
+        with self._cond:
+            records = list(self._idle)
+            self._idle.clear()
+            self._total -= len(records)
+            self._cond.notify_all()
+        for record in records:
+            self._close(record.connection)
+
+    def status(self) -> Dict[str, Any]:
+        """连接池状态"""
+        with self._cond:
+            return {
+                "pool_size": self._pool_size,
+                "max_overflow": self._max_overflow,
+                "idle": len(self._idle),
+                "checked_out": self._total - len(self._idle),
+                "total": self._total,
+            }
+
+    def _create_record(self) -> _ConnectionRecord:
+        """新建连接；失败时释放占用的名额"""
+        try:
+            return _ConnectionRecord(self._creator())
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def _replace(self, record: _ConnectionRecord) -> _ConnectionRecord:
+        """关闭失效或过期的连接并在原名额上重建"""
+        self._close(record.connection)
+        return self._create_record()
+
+    @staticmethod
+    def _ping(connection: pymysql.Connection) -> bool:
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception as e:
+            logger.warning(f"数据库连接已失效，将重新建立: {e}")
+            return False
+
+    @staticmethod
+    def _close(connection: pymysql.Connection) -> None:
+        try:
+            connection.close()
+        except Exception as e:
+            logger.error(f"关闭数据库连接失败: {e}")
+
+
 class DatabaseConnection:
     """数据库连接管理类"""
     
     def __init__(self):
         self.config = get_database_config()
-        self._connection_pool = []
-        self._max_connections = 10
-        self._current_connections = 0
+        self._pool = ConnectionPool(
+            self._create_connection,
+            pool_size=self.config["pool_size"],
+            max_overflow=self.config["max_overflow"],
+            timeout=self.config["pool_timeout"],
+            recycle=self.config["pool_recycle"],
+            pre_ping=self.config["pool_pre_ping"],
+        )
     
     def _create_connection(self) -> pymysql.Connection:
         """创建新的数据库连接"""
@@ -46,22 +190,29 @@ class DatabaseConnection:
     
     @contextmanager
     def get_connection(self) -> Generator[pymysql.Connection, None, None]:
-        """获取数据库连接的上下文管理器"""
-        connection = None
+        """从连接池取出连接的上下文管理器，退出时归还"""
+        record = self._pool.checkout()
+        discard = False
         try:
-            connection = self._create_connection()
-            yield connection
+            yield record.connection
         except Exception as e:
             logger.error(f"数据库操作失败: {e}")
-            if connection:
-                connection.rollback()
+            try:
+                record.connection.rollback()
+            except Exception:
+                # 回滚都失败说明连接已不可用，不再放回池中
+                discard = True
             raise
         finally:
-            if connection:
-                try:
-                    connection.close()
-                except Exception as e:
-                    logger.error(f"关闭数据库连接失败: {e}")
+            self._pool.checkin(record, discard=discard)
+
+    def pool_status(self) -> dict:
+        """获取连接池状态"""
+        return self._pool.status()
+
+    def close(self) -> None:
+        """关闭连接池中的空闲连接"""
+        self._pool.dispose()
     
     def test_connection(self) -> bool:
         """测试数据库连接"""
@@ -125,4 +276,9 @@ def test_database_connection() -> bool:
 
 def get_database_info() -> dict:
     """获取数据库信息"""
-    return db_connection.get_database_info() 
\ No newline at end of file
+    return db_connection.get_database_info()
+
+
+def close_database_connections() -> None:
+    """关闭数据库连接池"""
+    db_connection.close() 
\ No newline at end of file
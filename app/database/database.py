@@ -1,70 +1,241 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from datetime import datetime
+import base64
+import json
 import logging
+from pymysql.cursors import SSDictCursor
 from .connection import get_db_connection
+from .config import get_database_config
+from .query_stats import query_stats
+from .query_cache import query_cache, is_miss
 
 logger = logging.getLogger(__name__)
 
 
+def encode_cursor(sort_value: Any, id_value: Any) -> str:
+    """把 (排序键, 主键) 编码为不透明的分页游标"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    raw = json.dumps([sort_value, id_value], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """解析分页游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, id_value = json.loads(raw)
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, id_value
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def build_keyset_query(
+    select: str,
+    where: Optional[str],
+    params: Optional[Tuple],
+    sort_field: str,
+    id_field: str,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+    offset: int = 0,
+) -> Tuple[str, Tuple]:
+    """构造游标分页查询
+
+    按 (sort_field, id_field) 排序，游标之后的记录用
+    sort < x OR (sort = x AND id < y) 过滤（升序时为 >），可直接走排序列上的索引。
+    多取一条用于判断是否还有下一页。排序列不应为 NULL。
+    """
+    conditions = [f"({where})"] if where else []
+    all_params = list(params or ())
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor)
+        op = "<" if descending else ">"
+        conditions.append(f"({sort_field} {op} %s OR ({sort_field} = %s AND {id_field} {op} %s))")
+        all_params.extend([sort_value, sort_value, id_value])
+    direction = "DESC" if descending else "ASC"
+    query = select
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {sort_field} {direction}, {id_field} {direction} LIMIT %s"
+    all_params.append(limit + 1)
+    if offset and not cursor:
+        query += " OFFSET %s"
+        all_params.append(offset)
+    return query, tuple(all_params)
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int, sort_key: str, id_key: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """截取一页结果并生成下一页游标（没有下一页时为 None）"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[sort_key], last[id_key])
+
+
+def iter_bulk_insert(
+    cursor,
+    table: str,
+    rows: List[Dict[str, Any]],
+    max_packet: int,
+    max_rows: int,
+) -> Iterator[Tuple[str, Tuple, int]]:
+    """把多行数据拼成若干条参数化的多行 INSERT，产出 (SQL, 参数, 行数)
+
+    SQL 只含占位符，同一行数的批次语句相同，数据不会进入语句文本（查询统计、日志）。
+    cursor.mogrify 只用来估算每行转义后的字节数，单条语句不超过 max_packet（预留协议开销）
+    且不超过 max_rows 行。所有行的字段必须一致。
+    """
+    fields = list(rows[0].keys())
+    field_set = set(fields)
+    prefix = f"INSERT INTO {table} ({', '.join(fields)}) VALUES "
+    row_template = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    limit = max_packet - 1024
+    params: List[Any] = []
+    count = 0
+    size = len(prefix)
+    for row in rows:
+        if row.keys() != field_set:
+            raise ValueError("批量插入的各行字段必须一致")
+        row_params = tuple(row[field] for field in fields)
+        value_size = len(cursor.mogrify(row_template, row_params).encode("utf-8")) + 1
+        if count and (size + value_size > limit or count >= max_rows):
+            yield prefix + ",".join([row_template] * count), tuple(params), count
+            params, count, size = [], 0, len(prefix)
+        params.extend(row_params)
+        count += 1
+        size += value_size
+    if count:
+        yield prefix + ",".join([row_template] * count), tuple(params), count
+
+
 class Database:
     """数据库操作类"""
     
     def __init__(self):
         self.db_connection = get_db_connection()
+        self.config = get_database_config()
+        self._auto_increment_step: Optional[int] = None
+    
+    def _get_auto_increment_step(self, cursor) -> int:
+        """auto_increment_increment（首次批量插入时读取一次）"""
+        if self._auto_increment_step is None:
+            cursor.execute("SELECT @@auto_increment_increment AS step")
+            self._auto_increment_step = int(cursor.fetchone()["step"])
+        return self._auto_increment_step
     
-    def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
-        """执行查询语句，返回所有结果"""
+    def execute_query(self, query: str, params: Optional[Tuple] = None, cache: bool = False) -> List[Dict[str, Any]]:
+        """执行查询语句，返回所有结果
+        
+        cache=True 时结果进入查询缓存，涉及的表有写入时失效。
+        """
+        key = None
+        if cache:
+            key, cached = query_cache.lookup(query, params)
+            if not is_miss(cached):
+                return cached
         try:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    return cursor.fetchall()
+                    with query_stats.track(query, params) as timer:
+                        cursor.execute(query, params)
+                        rows = cursor.fetchall()
+                        timer.rows = len(rows)
+                    return query_cache.store(key, query, rows)
         except Exception as e:
             logger.error(f"查询执行失败: {e}, SQL: {query}, 参数: {params}")
             raise
     
-    def execute_one(self, query: str, params: Optional[Tuple] = None) -> Optional[Dict[str, Any]]:
-        """执行查询语句，返回单条记录"""
+    def execute_one(self, query: str, params: Optional[Tuple] = None, cache: bool = False) -> Optional[Dict[str, Any]]:
+        """执行查询语句，返回单条记录（cache 含义同 execute_query）"""
+        key = None
+        if cache:
+            key, cached = query_cache.lookup(query, params)
+            if not is_miss(cached):
+                return cached
         try:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    return cursor.fetchone()
+                    with query_stats.track(query, params) as timer:
+                        cursor.execute(query, params)
+                        row = cursor.fetchone()
+                        timer.rows = 1 if row else 0
+                    return query_cache.store(key, query, row)
         except Exception as e:
             logger.error(f"查询执行失败: {e}, SQL: {query}, 参数: {params}")
             raise
     
+    def stream_query(self, query: str, params: Optional[Tuple] = None, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """流式查询，使用服务端游标（不缓冲结果集）逐批返回记录
+
+        迭代期间独占一条连接；未迭代完就中止时关闭该连接，由连接池丢弃。
+        """
+        try:
+            with self.db_connection.get_connection() as conn:
+                cursor = conn.cursor(SSDictCursor)
+                finished = False
+                try:
+                    with query_stats.track(query, params):
+                        cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            finished = True
+                            break
+                        yield rows
+                finally:
+                    if finished:
+                        cursor.close()
+                    else:
+                        # 未读完的结果集会阻塞连接，直接关闭比读完剩余数据更快
+                        conn.close()
+        except Exception as e:
+            logger.error(f"流式查询失败: {e}, SQL: {query}, 参数: {params}")
+            raise
+    
     def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
         """执行更新语句，返回影响的行数"""
         try:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    result = cursor.execute(query, params)
-                    return result
+                    with query_stats.track(query, params) as timer:
+                        timer.rows = cursor.execute(query, params)
         except Exception as e:
             logger.error(f"更新执行失败: {e}, SQL: {query}, 参数: {params}")
             raise
+        query_cache.invalidate_query(query)
+        return timer.rows
     
     def execute_insert(self, query: str, params: Optional[Tuple] = None) -> int:
         """执行插入语句，返回插入的ID"""
         try:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    return cursor.lastrowid
+                    with query_stats.track(query, params) as timer:
+                        timer.rows = cursor.execute(query, params)
+                    last_id = cursor.lastrowid
         except Exception as e:
             logger.error(f"插入执行失败: {e}, SQL: {query}, 参数: {params}")
             raise
+        query_cache.invalidate_query(query)
+        return last_id
     
     def execute_many(self, query: str, params_list: List[Tuple]) -> int:
         """批量执行SQL语句"""
         try:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    result = cursor.executemany(query, params_list)
-                    return result
+                    with query_stats.track(query) as timer:
+                        timer.rows = cursor.executemany(query, params_list)
         except Exception as e:
             logger.error(f"批量执行失败: {e}, SQL: {query}")
             raise
+        query_cache.invalidate_query(query)
+        return timer.rows
     
     def execute_transaction(self, queries: List[Tuple[str, Optional[Tuple]]]) -> bool:
         """执行事务，包含多个SQL语句"""
@@ -72,11 +243,14 @@ class Database:
             with self.db_connection.get_connection() as conn:
                 with conn.cursor() as cursor:
                     for query, params in queries:
-                        cursor.execute(query, params)
-                    return True
+                        with query_stats.track(query, params) as timer:
+                            timer.rows = cursor.execute(query, params)
         except Exception as e:
             logger.error(f"事务执行失败: {e}")
             raise
+        for query, _ in queries:
+            query_cache.invalidate_query(query)
+        return True
     
     def count(self, table: str, where: Optional[str] = None, params: Optional[Tuple] = None) -> int:
         """获取表中记录数量"""
@@ -93,12 +267,12 @@ class Database:
         result = self.execute_one(query, params)
         return result is not None
     
-    def get_by_id(self, table: str, id_value: Any, id_field: str = "id") -> Optional[Dict[str, Any]]:
+    def get_by_id(self, table: str, id_value: Any, id_field: str = "id", cache: bool = False) -> Optional[Dict[str, Any]]:
         """根据ID获取记录"""
         query = f"SELECT * FROM {table} WHERE {id_field} = %s"
-        return self.execute_one(query, (id_value,))
+        return self.execute_one(query, (id_value,), cache=cache)
     
-    def get_all(self, table: str, order_by: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    def get_all(self, table: str, order_by: Optional[str] = None, limit: Optional[int] = None, cache: bool = False) -> List[Dict[str, Any]]:
         """获取表中所有记录"""
         query = f"SELECT * FROM {table}"
         if order_by:
@@ -106,7 +280,29 @@ class Database:
         if limit:
             query += f" LIMIT {limit}"
         
-        return self.execute_query(query)
+        return self.execute_query(query, cache=cache)
+    
+    def paginate(
+        self,
+        select: str,
+        sort_field: str,
+        id_field: str,
+        where: Optional[str] = None,
+        params: Optional[Tuple] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = True,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """游标分页查询，返回 (本页记录, 下一页游标)
+
+        sort_field/id_field 为 SQL 中的列（可带表别名），结果中取不带别名的同名字段生成游标。
+        """
+        query, all_params = build_keyset_query(
+            select, where, params, sort_field, id_field, cursor, limit, descending, offset
+        )
+        rows = self.execute_query(query, all_params)
+        return split_page(rows, limit, sort_field.split(".")[-1], id_field.split(".")[-1])
     
     def insert(self, table: str, data: Dict[str, Any]) -> int:
         """插入记录"""
@@ -117,6 +313,35 @@ class Database:
         query = f"INSERT INTO {table} ({field_names}) VALUES ({placeholders})"
         return self.execute_insert(query, tuple(data.values()))
     
+    def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> List[int]:
+        """批量插入记录，返回按行顺序排列的自增ID
+        
+        单条多行 INSERT 分配的自增ID以 auto_increment_increment 为步长依次递增，
+        由 lastrowid（首行ID）、行数和步长推出。
+        所有语句在同一连接、同一个显式事务中执行，任一语句失败时整体回滚。
+        """
+        if not rows:
+            return []
+        ids: List[int] = []
+        try:
+            with self.db_connection.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    step = self._get_auto_increment_step(cursor)
+                    conn.begin()
+                    for query, params, count in iter_bulk_insert(
+                        cursor, table, rows,
+                        self.config["max_allowed_packet"], self.config["bulk_insert_max_rows"]
+                    ):
+                        with query_stats.track(query, params) as timer:
+                            timer.rows = cursor.execute(query, params)
+                        ids.extend(range(cursor.lastrowid, cursor.lastrowid + count * step, step))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"批量插入失败: {e}, 表: {table}, 行数: {len(rows)}")
+            raise
+        query_cache.invalidate_table(table)
+        return ids
+    
     def update(self, table: str, data: Dict[str, Any], where: str, params: Optional[Tuple] = None) -> int:
         """更新记录"""
         set_clause = ", ".join([f"{field} = %s" for field in data.keys()])
@@ -4,259 +4,760 @@
 # @File    : models.py
 # @Software: PyCharm
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from datetime import datetime, timedelta
+import re
 from .database import get_database
+from .async_database import get_async_database, AsyncDatabase
+from .reference_data import get_reference_cache
+from app.core.singleflight import SingleFlight
+from app.core.auth_cache import get_principal_cache
 
 db = get_database()
+adb = get_async_database()
+reference_cache = get_reference_cache()
+principal_cache = get_principal_cache()
 
+# 合并并发的相同航班读取（仅限不在工作单元事务中的读取）
+flight_loads = SingleFlight("flight")
 
-class BaseModel:
+
+def _adb(session: Optional[AsyncDatabase] = None) -> AsyncDatabase:
+    """传入工作单元时在其连接上执行，否则使用全局异步连接池"""
+    return session if session is not None else adb
+
+
+def _invalidate_principal(session: Optional[AsyncDatabase], user_id: int) -> None:
+    """立即失效已认证用户缓存，并在事务提交后再失效一次（防止提交前被其他请求回填旧行）"""
+    principal_cache.invalidate(user_id)
+    _adb(session).after_commit(lambda: principal_cache.invalidate(user_id))
+
+
+# 注册时允许的用户名格式（与 UserRegisterRequest 校验一致）
+_USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9_]+$')
+
+# 关联数据尚未预加载的标记
+_NOT_LOADED = object()
+
+
+class ModelMeta(type):
+    """根据 __columns__（列名 -> 默认值）生成 __slots__ 和列元数据
+
+    __extra_slots__ 声明不对应数据库列的内部属性（如预加载的关联数据）及其初始值。
+    """
+    
+    def __new__(mcs, name, bases, namespace):
+        columns = namespace.get('__columns__')
+        if columns is not None:
+            extras = namespace.get('__extra_slots__', {})
+            namespace['__slots__'] = tuple(columns) + tuple(extras)
+            namespace['_column_names'] = tuple(columns)
+            namespace['_column_items'] = tuple(columns.items())
+            namespace['_extra_items'] = tuple(extras.items())
+        else:
+            namespace.setdefault('__slots__', ())
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class ConcurrentUpdateError(Exception):
+    """带乐观并发条件的更新没有命中记录：记录已被其他请求修改或删除"""
+
+
+class BaseModel(metaclass=ModelMeta):
+    """模型基类
+    
+    子类在 __columns__ 中声明一次列及默认值，实例只有 __slots__ 而没有 __dict__。
+    未声明的键会被忽略。
+    
+    从数据库加载的实例会记录各列的原始值，save() 只更新有变化的列；
+    __table__ / __primary_key__ 声明表和主键，__db_managed__ 中的列由数据库维护，
+    __version_column__ 声明版本号列（可选，更新时自动作为乐观锁条件并加一）。
+    """
+    
+    __slots__ = ('_original',)
+    __table__: Optional[str] = None
+    __primary_key__: Optional[str] = None
+    __db_managed__: Tuple[str, ...] = ()
+    __version_column__: Optional[str] = None
+    
+    _column_names: Tuple[str, ...] = ()
+    _column_items: Tuple[Tuple[str, Any], ...] = ()
+    _extra_items: Tuple[Tuple[str, Any], ...] = ()
+    
     def __init__(self, **kwargs):
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self._hydrate(kwargs, loaded=False)
+    
+    def _hydrate(self, data: Dict[str, Any], loaded: bool) -> None:
+        """按列声明一次性填充属性，loaded 为 True 时记录原始值"""
+        get = data.get
+        values = []
+        for name, default in self._column_items:
+            value = get(name, default)
+            setattr(self, name, value)
+            values.append(value)
+        for name, default in self._extra_items:
+            setattr(self, name, default)
+        self._original = tuple(values) if loaded else None
     
     def to_dict(self) -> Dict[str, Any]:
-        return {key: value for key, value in self.__dict__.items() if not key.startswith('_')}
+        return {name: getattr(self, name) for name in self._column_names}
+    
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]):
+        """从查询结果行创建实例（不经过 **kwargs 展开）"""
+        instance = cls.__new__(cls)
+        instance._hydrate(row, loaded=True)
+        return instance
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> list:
+        """批量创建实例"""
+        return [cls.from_row(row) for row in rows]
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]):
         """从字典创建实例"""
-        return cls(**data)
+        return cls.from_row(data)
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._column_names[:3])
+        return f"{type(self).__name__}({fields})"
+    
+    def changed_fields(self) -> Dict[str, Any]:
+        """相对加载时有变化的列；未从数据库加载的实例返回全部列"""
+        if self._original is None:
+            return self.to_dict()
+        return {
+            name: getattr(self, name)
+            for name, old in zip(self._column_names, self._original)
+            if getattr(self, name) != old
+        }
+    
+    def original_value(self, name: str) -> Any:
+        """列在加载时的值"""
+        if self._original is None:
+            raise ValueError(f"{type(self).__name__} 不是从数据库加载的实例")
+        return self._original[self._column_names.index(name)]
+    
+    def is_dirty(self) -> bool:
+        return bool(self.changed_fields())
+    
+    def mark_clean(self) -> None:
+        """把当前值记为原始值（保存成功后调用）"""
+        self._original = tuple(getattr(self, name) for name in self._column_names)
+    
+    def _insert_data(self) -> Dict[str, Any]:
+        """INSERT 的列：去掉主键和值为空的数据库维护列"""
+        data = self.to_dict()
+        data.pop(self.__primary_key__, None)
+        for name in self.__db_managed__:
+            if data.get(name) is None:
+                data.pop(name, None)
+        return data
+    
+    def _update_statement(self, guard: bool, expected: Optional[Dict[str, Any]]):
+        """构造部分更新，返回 (变更列, WHERE, 参数, 是否带并发条件)，无变更时返回 None"""
+        excluded = (self.__primary_key__, self.__version_column__) + tuple(self.__db_managed__)
+        data = {name: value for name, value in self.changed_fields().items() if name not in excluded}
+        if not data:
+            return None
+        
+        where = [f"{self.__primary_key__} = %s"]
+        params = [getattr(self, self.__primary_key__)]
+        conditions: Dict[str, Any] = {}
+        if guard and self._original is not None:
+            conditions.update({name: self.original_value(name) for name in data})
+        if expected:
+            conditions.update(expected)
+        version = self.__version_column__
+        if version:
+            current = getattr(self, version)
+            conditions[version] = current
+            data[version] = (current or 0) + 1
+        for name, value in conditions.items():
+            where.append(f"{name} <=> %s")
+            params.append(value)
+        return data, " AND ".join(where), tuple(params), bool(conditions)
+    
+    def _after_update(self, data: Dict[str, Any], affected: int, guarded: bool) -> int:
+        if guarded and affected == 0:
+            raise ConcurrentUpdateError(
+                f"{self.__table__} {self.__primary_key__}={getattr(self, self.__primary_key__)} 已被其他请求修改"
+            )
+        if self.__version_column__:
+            setattr(self, self.__version_column__, data[self.__version_column__])
+        self.mark_clean()
+        return affected
+    
+    def save(self, guard: bool = False, expected: Optional[Dict[str, Any]] = None) -> int:
+        """保存：新实例执行 INSERT 并返回主键，已有实例只 UPDATE 变化的列并返回影响行数
+        
+        guard=True 时以变更列的原始值作为更新条件，expected 追加 {列: 期望的当前值} 条件；
+        带条件的更新未命中时抛出 ConcurrentUpdateError。
+        """
+        if not getattr(self, self.__primary_key__):
+            new_id = db.insert(self.__table__, self._insert_data())
+            setattr(self, self.__primary_key__, new_id)
+            self.mark_clean()
+            return new_id
+        statement = self._update_statement(guard, expected)
+        if statement is None:
+            return 0
+        data, where, params, guarded = statement
+        affected = db.update(self.__table__, data, where, params)
+        return self._after_update(data, affected, guarded)
+    
+    async def save_async(self, session: Optional[AsyncDatabase] = None, guard: bool = False,
+                         expected: Optional[Dict[str, Any]] = None) -> int:
+        """保存（异步，参数同 save）"""
+        if not getattr(self, self.__primary_key__):
+            new_id = await _adb(session).insert(self.__table__, self._insert_data())
+            setattr(self, self.__primary_key__, new_id)
+            self.mark_clean()
+            return new_id
+        statement = self._update_statement(guard, expected)
+        if statement is None:
+            return 0
+        data, where, params, guarded = statement
+        affected = await _adb(session).update(self.__table__, data, where, params)
+        return self._after_update(data, affected, guarded)
+
+
+class BatchLoader:
+    """批量关联加载器（DataLoader 风格）
+
+    先收集一批外键，再用 WHERE key IN (...) 一次取回，避免逐条查询的 N+1 问题。
+    many=True 时按键返回记录列表，否则按键返回单条记录。
+    """
+    
+    CHUNK_SIZE = 500  # 单条 IN 查询的最大键数
+    
+    def __init__(self, model_cls, table: str, key_field: str, many: bool = False):
+        self.model_cls = model_cls
+        self.table = table
+        self.key_field = key_field
+        self.many = many
+    
+    def _queries(self, keys: Iterable[Any]) -> List[Tuple[str, Tuple]]:
+        unique_keys = list(dict.fromkeys(key for key in keys if key is not None))
+        queries = []
+        for i in range(0, len(unique_keys), self.CHUNK_SIZE):
+            chunk = tuple(unique_keys[i:i + self.CHUNK_SIZE])
+            placeholders = ", ".join(["%s"] * len(chunk))
+            queries.append((f"SELECT * FROM {self.table} WHERE {self.key_field} IN ({placeholders})", chunk))
+        return queries
+    
+    def _collect(self, result: Dict[Any, Any], data_list: List[Dict[str, Any]]) -> None:
+        for data in data_list:
+            instance = self.model_cls.from_row(data)
+            key = data[self.key_field]
+            if self.many:
+                result.setdefault(key, []).append(instance)
+            else:
+                result[key] = instance
+    
+    def load(self, keys: Iterable[Any]) -> Dict[Any, Any]:
+        """批量加载"""
+        result: Dict[Any, Any] = {}
+        for query, params in self._queries(keys):
+            self._collect(result, db.execute_query(query, params))
+        return result
+    
+    async def load_async(self, keys: Iterable[Any], session: Optional[AsyncDatabase] = None) -> Dict[Any, Any]:
+        """批量加载（异步）"""
+        result: Dict[Any, Any] = {}
+        for query, params in self._queries(keys):
+            self._collect(result, await _adb(session).execute_query(query, params))
+        return result
 
 
 class User(BaseModel):
     """用户模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.id = kwargs.get('id')
-        self.username = kwargs.get('username')
-        self.nickname = kwargs.get('nickname')
-        self.avatar = kwargs.get('avatar')
-        self.signature = kwargs.get('signature')
-        self.password = kwargs.get('password')
-        self.email = kwargs.get('email')
-        self.phone = kwargs.get('phone')
-        self.id_card = kwargs.get('id_card')
-        self.real_name = kwargs.get('real_name')
-        self.gender = kwargs.get('gender', '未知')
-        self.age = kwargs.get('age')
-        self.user_type = kwargs.get('user_type', 'passenger')
-        self.vip_level = kwargs.get('vip_level', 0)
-        self.created_at = kwargs.get('created_at')
+    __table__ = 'users'
+    __primary_key__ = 'id'
+    __db_managed__ = ('created_at',)
+    __columns__ = {
+        'id': None,
+        'username': None,
+        'nickname': None,
+        'avatar': None,
+        'signature': None,
+        'password': None,
+        'email': None,
+        'phone': None,
+        'id_card': None,
+        'real_name': None,
+        'gender': '未知',
+        'age': None,
+        'user_type': 'passenger',
+        'vip_level': 0,
+        'created_at': None,
+    }
+    
+    def save(self, guard: bool = False, expected: Optional[Dict[str, Any]] = None) -> int:
+        """保存并失效已认证用户缓存"""
+        result = super().save(guard=guard, expected=expected)
+        principal_cache.invalidate(self.id)
+        return result
+    
+    async def save_async(self, session: Optional[AsyncDatabase] = None, guard: bool = False,
+                         expected: Optional[Dict[str, Any]] = None) -> int:
+        """保存（异步）并失效已认证用户缓存；在工作单元中时提交后再失效一次"""
+        result = await super().save_async(session=session, guard=guard, expected=expected)
+        _invalidate_principal(session, self.id)
+        return result
     
     @classmethod
     def get_by_id(cls, user_id: int) -> Optional['User']:
         """根据ID获取用户"""
         data = db.get_by_id('users', user_id)
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_async(cls, user_id: int, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据ID获取用户（异步）"""
+        data = await _adb(session).get_by_id('users', user_id)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_username(cls, username: str) -> Optional['User']:
         """根据用户名获取用户"""
         data = db.execute_one("SELECT * FROM users WHERE username = %s", (username,))
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_username_async(cls, username: str, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据用户名获取用户（异步）"""
+        data = await _adb(session).execute_one("SELECT * FROM users WHERE username = %s", (username,))
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_email(cls, email: str) -> Optional['User']:
         """根据邮箱获取用户"""
         data = db.execute_one("SELECT * FROM users WHERE email = %s", (email,))
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_email_async(cls, email: str, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据邮箱获取用户（异步）"""
+        data = await _adb(session).execute_one("SELECT * FROM users WHERE email = %s", (email,))
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_phone(cls, phone: str) -> Optional['User']:
         """根据手机号获取用户"""
         data = db.execute_one("SELECT * FROM users WHERE phone = %s", (phone,))
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_phone_async(cls, phone: str, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据手机号获取用户（异步）"""
+        data = await _adb(session).execute_one("SELECT * FROM users WHERE phone = %s", (phone,))
+        return cls.from_row(data) if data else None
+    
+    @staticmethod
+    def _login_lookup(identifier: str) -> Tuple[str, Tuple]:
+        """按登录标识的格式选择索引查找：含 @ 查邮箱，纯数字同时查用户名和手机号，其余用户名格式查用户名，否则查手机号"""
+        if '@' in identifier:
+            return "SELECT * FROM users WHERE email = %s LIMIT 1", (identifier,)
+        if _USERNAME_PATTERN.match(identifier):
+            if not identifier.isdigit():
+                return "SELECT * FROM users WHERE username = %s", (identifier,)
+            # 纯数字既可能是用户名也可能是手机号，用户名优先
+            return (
+                "(SELECT *, 0 AS login_rank FROM users WHERE username = %s) "
+                "UNION ALL (SELECT *, 1 AS login_rank FROM users WHERE phone = %s LIMIT 1) "
+                "ORDER BY login_rank LIMIT 1",
+                (identifier, identifier)
+            )
+        return "SELECT * FROM users WHERE phone = %s LIMIT 1", (identifier,)
+    
+    @classmethod
+    def find_by_login_identifier(cls, identifier: str) -> Optional['User']:
+        """根据用户名、邮箱或手机号查找登录用户（一次查询）"""
+        query, params = cls._login_lookup(identifier)
+        data = db.execute_one(query, params)
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def find_by_login_identifier_async(cls, identifier: str, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据用户名、邮箱或手机号查找登录用户（异步，一次查询）"""
+        query, params = cls._login_lookup(identifier)
+        data = await _adb(session).execute_one(query, params)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_id_card(cls, id_card: str) -> Optional['User']:
         """根据身份证号获取用户"""
         data = db.execute_one("SELECT * FROM users WHERE id_card = %s", (id_card,))
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_card_async(cls, id_card: str, session: Optional[AsyncDatabase] = None) -> Optional['User']:
+        """根据身份证号获取用户（异步）"""
+        data = await _adb(session).execute_one("SELECT * FROM users WHERE id_card = %s", (id_card,))
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_all(cls, skip: int = 0, limit: int = 100) -> List['User']:
         """获取所有用户"""
         query = "SELECT * FROM users ORDER BY created_at DESC LIMIT %s OFFSET %s"
         data_list = db.execute_query(query, (limit, skip))
-        return [cls(**data) for data in data_list]
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_all_async(cls, skip: int = 0, limit: int = 100, session: Optional[AsyncDatabase] = None) -> List['User']:
+        """获取所有用户（异步）"""
+        query = "SELECT * FROM users ORDER BY created_at DESC LIMIT %s OFFSET %s"
+        data_list = await _adb(session).execute_query(query, (limit, skip))
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_page_async(cls, cursor: Optional[str] = None, limit: int = 100, skip: int = 0, session: Optional[AsyncDatabase] = None) -> Tuple[List['User'], Optional[str]]:
+        """游标分页获取用户，按注册时间倒序，返回 (用户列表, 下一页游标)"""
+        data_list, next_cursor = await _adb(session).paginate(
+            "SELECT * FROM users", "created_at", "id",
+            cursor=cursor, limit=limit, offset=skip
+        )
+        return cls.from_rows(data_list), next_cursor
     
     @classmethod
     def delete_by_id(cls, user_id: int) -> bool:
         """根据ID删除用户"""
         result = db.execute_update("DELETE FROM users WHERE id = %s", (user_id,))
+        principal_cache.invalidate(user_id)
+        return result > 0
+    
+    @classmethod
+    async def delete_by_id_async(cls, user_id: int, session: Optional[AsyncDatabase] = None) -> bool:
+        """根据ID删除用户（异步）"""
+        result = await _adb(session).execute_update("DELETE FROM users WHERE id = %s", (user_id,))
+        _invalidate_principal(session, user_id)
         return result > 0
     
-    def save(self) -> int:
-        """保存用户"""
-        if self.id:
-            # 更新
-            data = self.to_dict()
-            data.pop('id', None)  # 移除id字段
-            data.pop('created_at', None)  # 移除创建时间
-            return db.update('users', data, 'id = %s', (self.id,))
-        else:
-            # 插入
-            data = self.to_dict()
-            data.pop('id', None)  # 移除id字段
-            self.id = db.insert('users', data)
-            return self.id
 
 
 class Aircraft(BaseModel):
     """飞机型号模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.aircraft_id = kwargs.get('aircraft_id')
-        self.model_name = kwargs.get('model_name')
-        self.business_capacity = kwargs.get('business_capacity', 0)
-        self.first_class_capacity = kwargs.get('first_class_capacity', 0)
-        self.economy_capacity = kwargs.get('economy_capacity', 0)
+    __table__ = 'aircraft'
+    __primary_key__ = 'aircraft_id'
+    __columns__ = {
+        'aircraft_id': None,
+        'model_name': None,
+        'business_capacity': 0,
+        'first_class_capacity': 0,
+        'economy_capacity': 0,
+    }
     
     @classmethod
     def get_by_id(cls, aircraft_id: int) -> Optional['Aircraft']:
-        """根据ID获取飞机型号"""
-        data = db.get_by_id('aircraft', aircraft_id, 'aircraft_id')
-        return cls(**data) if data else None
+        """根据ID获取飞机型号（优先读取参考数据缓存）"""
+        data = reference_cache.get_aircraft(aircraft_id) or db.get_by_id('aircraft', aircraft_id, 'aircraft_id', cache=True)
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_async(cls, aircraft_id: int, session: Optional[AsyncDatabase] = None) -> Optional['Aircraft']:
+        """根据ID获取飞机型号（异步，优先读取参考数据缓存）"""
+        data = reference_cache.get_aircraft(aircraft_id)
+        if data is None:
+            data = await _adb(session).get_by_id('aircraft', aircraft_id, 'aircraft_id', cache=True)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_all(cls) -> List['Aircraft']:
         """获取所有飞机型号"""
-        data_list = db.get_all('aircraft')
-        return [cls(**data) for data in data_list]
+        data_list = reference_cache.get_all_aircraft()
+        if data_list is None:
+            data_list = db.get_all('aircraft', cache=True)
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_all_async(cls, session: Optional[AsyncDatabase] = None) -> List['Aircraft']:
+        """获取所有飞机型号（异步）"""
+        data_list = reference_cache.get_all_aircraft()
+        if data_list is None:
+            data_list = await _adb(session).get_all('aircraft', cache=True)
+        return cls.from_rows(data_list)
 
 
 class Route(BaseModel):
     """航线模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.route_id = kwargs.get('route_id')
-        self.departure_city = kwargs.get('departure_city')
-        self.arrival_city = kwargs.get('arrival_city')
-        self.distance_km = kwargs.get('distance_km')
+    __table__ = 'routes'
+    __primary_key__ = 'route_id'
+    __columns__ = {
+        'route_id': None,
+        'departure_city': None,
+        'arrival_city': None,
+        'distance_km': None,
+    }
     
     @classmethod
     def get_by_id(cls, route_id: int) -> Optional['Route']:
-        """根据ID获取航线"""
-        data = db.get_by_id('routes', route_id, 'route_id')
-        return cls(**data) if data else None
+        """根据ID获取航线（优先读取参考数据缓存）"""
+        data = reference_cache.get_route(route_id) or db.get_by_id('routes', route_id, 'route_id', cache=True)
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_async(cls, route_id: int, session: Optional[AsyncDatabase] = None) -> Optional['Route']:
+        """根据ID获取航线（异步，优先读取参考数据缓存）"""
+        data = reference_cache.get_route(route_id)
+        if data is None:
+            data = await _adb(session).get_by_id('routes', route_id, 'route_id', cache=True)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_cities(cls, departure_city: str, arrival_city: str) -> Optional['Route']:
-        """根据出发和到达城市获取航线"""
-        data = db.execute_one(
-            "SELECT * FROM routes WHERE departure_city = %s AND arrival_city = %s",
-            (departure_city, arrival_city)
-        )
-        return cls(**data) if data else None
+        """根据出发和到达城市获取航线（优先读取参考数据缓存）"""
+        data = reference_cache.get_route_by_cities(departure_city, arrival_city)
+        if data is None:
+            data = db.execute_one(
+                "SELECT * FROM routes WHERE departure_city = %s AND arrival_city = %s",
+                (departure_city, arrival_city)
+            )
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_cities_async(cls, departure_city: str, arrival_city: str, session: Optional[AsyncDatabase] = None) -> Optional['Route']:
+        """根据出发和到达城市获取航线（异步，优先读取参考数据缓存）"""
+        data = reference_cache.get_route_by_cities(departure_city, arrival_city)
+        if data is None:
+            data = await _adb(session).execute_one(
+                "SELECT * FROM routes WHERE departure_city = %s AND arrival_city = %s",
+                (departure_city, arrival_city)
+            )
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_all(cls) -> List['Route']:
         """获取所有航线"""
-        data_list = db.get_all('routes')
-        return [cls(**data) for data in data_list]
+        data_list = reference_cache.get_all_routes()
+        if data_list is None:
+            data_list = db.get_all('routes', cache=True)
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_all_async(cls, session: Optional[AsyncDatabase] = None) -> List['Route']:
+        """获取所有航线（异步）"""
+        data_list = reference_cache.get_all_routes()
+        if data_list is None:
+            data_list = await _adb(session).get_all('routes', cache=True)
+        return cls.from_rows(data_list)
 
 
 class Flight(BaseModel):
     """航班模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.flight_id = kwargs.get('flight_id')
-        self.flight_number = kwargs.get('flight_number')
-        self.airline = kwargs.get('airline')
-        self.route_id = kwargs.get('route_id')
-        self.aircraft_id = kwargs.get('aircraft_id')
-        self.departure_time = kwargs.get('departure_time')
-        self.arrival_time = kwargs.get('arrival_time')
-        self.business_price = kwargs.get('business_price')
-        self.economy_price = kwargs.get('economy_price')
-        self.first_class_price = kwargs.get('first_class_price')
-        self.business_seats_available = kwargs.get('business_seats_available', 0)
-        self.economy_seats_available = kwargs.get('economy_seats_available', 0)
-        self.first_class_seats_available = kwargs.get('first_class_seats_available', 0)
-        self.status = kwargs.get('status', '计划中')
+    __table__ = 'flights'
+    __primary_key__ = 'flight_id'
+    __columns__ = {
+        'flight_id': None,
+        'flight_number': None,
+        'airline': None,
+        'route_id': None,
+        'aircraft_id': None,
+        'departure_time': None,
+        'arrival_time': None,
+        'business_price': None,
+        'economy_price': None,
+        'first_class_price': None,
+        'business_seats_available': 0,
+        'economy_seats_available': 0,
+        'first_class_seats_available': 0,
+        'status': '计划中',
+    }
     
     @classmethod
     def get_by_id(cls, flight_id: int) -> Optional['Flight']:
         """根据ID获取航班"""
-        data = db.get_by_id('flights', flight_id, 'flight_id')
-        return cls(**data) if data else None
+        data = db.get_by_id('flights', flight_id, 'flight_id', cache=True)
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_async(cls, flight_id: int, session: Optional[AsyncDatabase] = None) -> Optional['Flight']:
+        """根据ID获取航班（异步，不带工作单元时合并并发的相同读取）"""
+        if session is None:
+            data = await flight_loads.do(
+                ('by_id', flight_id), lambda: adb.get_by_id('flights', flight_id, 'flight_id', cache=True)
+            )
+        else:
+            data = await session.get_by_id('flights', flight_id, 'flight_id', cache=True)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_by_number(cls, flight_number: str) -> Optional['Flight']:
         """根据航班号获取航班"""
         data = db.execute_one("SELECT * FROM flights WHERE flight_number = %s", (flight_number,))
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_number_async(cls, flight_number: str, session: Optional[AsyncDatabase] = None) -> Optional['Flight']:
+        """根据航班号获取航班（异步）"""
+        data = await _adb(session).execute_one("SELECT * FROM flights WHERE flight_number = %s", (flight_number,))
+        return cls.from_row(data) if data else None
+    
+    _SEARCH_QUERY = """
+        SELECT f.* FROM flights f
+        JOIN routes r ON f.route_id = r.route_id
+        WHERE r.departure_city = %s 
+        AND r.arrival_city = %s
+        AND f.departure_time >= %s
+        AND f.departure_time < %s
+        AND f.status = '计划中'
+        ORDER BY f.departure_time
+    """
+    
+    @staticmethod
+    def _search_params(departure_city: str, arrival_city: str, departure_date: str) -> Tuple:
+        """把出发日期转换为左闭右开的时间区间，使 departure_time 上的索引可用"""
+        day_start = datetime.strptime(departure_date, "%Y-%m-%d")
+        return departure_city, arrival_city, day_start, day_start + timedelta(days=1)
     
     @classmethod
     def search_flights(cls, departure_city: str, arrival_city: str, departure_date: str) -> List['Flight']:
         """搜索航班"""
-        query = """
-            SELECT f.* FROM flights f
-            JOIN routes r ON f.route_id = r.route_id
-            WHERE r.departure_city = %s 
-            AND r.arrival_city = %s
-            AND DATE(f.departure_time) = %s
-            AND f.status = '计划中'
-            ORDER BY f.departure_time
-        """
-        data_list = db.execute_query(query, (departure_city, arrival_city, departure_date))
-        return [cls(**data) for data in data_list]
+        data_list = db.execute_query(cls._SEARCH_QUERY, cls._search_params(departure_city, arrival_city, departure_date))
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def search_flights_async(cls, departure_city: str, arrival_city: str, departure_date: str, session: Optional[AsyncDatabase] = None) -> List['Flight']:
+        """搜索航班（异步）"""
+        data_list = await _adb(session).execute_query(cls._SEARCH_QUERY, cls._search_params(departure_city, arrival_city, departure_date))
+        return cls.from_rows(data_list)
+    
+    # 航班详情投影：一次联表取回航线城市、距离和机型，供接口直接返回
+    _DETAIL_SELECT = """
+        SELECT f.flight_id, f.flight_number, f.airline,
+               r.departure_city, r.arrival_city,
+               f.departure_time, f.arrival_time,
+               f.business_price, f.economy_price, f.first_class_price,
+               f.business_seats_available, f.economy_seats_available, f.first_class_seats_available,
+               f.status, a.model_name AS aircraft_model, r.distance_km
+        FROM flights f
+        LEFT JOIN routes r ON f.route_id = r.route_id
+        LEFT JOIN aircraft a ON f.aircraft_id = a.aircraft_id
+    """
+    
+    _SEARCH_DETAILS_QUERY = _DETAIL_SELECT + """
+        WHERE r.departure_city = %s 
+        AND r.arrival_city = %s
+        AND f.departure_time >= %s
+        AND f.departure_time < %s
+        AND f.status = '计划中'
+        ORDER BY f.departure_time
+    """
+    
+    _DETAIL_QUERY = _DETAIL_SELECT + " WHERE f.flight_id = %s"
+    
+    @classmethod
+    def search_flight_details(cls, departure_city: str, arrival_city: str, departure_date: str) -> List[Dict[str, Any]]:
+        """搜索航班，单次查询返回含航线和机型信息的字典"""
+        return db.execute_query(cls._SEARCH_DETAILS_QUERY, cls._search_params(departure_city, arrival_city, departure_date))
+    
+    @classmethod
+    async def search_flight_details_async(cls, departure_city: str, arrival_city: str, departure_date: str, session: Optional[AsyncDatabase] = None) -> List[Dict[str, Any]]:
+        """搜索航班，单次查询返回含航线和机型信息的字典（异步）"""
+        return await _adb(session).execute_query(cls._SEARCH_DETAILS_QUERY, cls._search_params(departure_city, arrival_city, departure_date))
+    
+    @classmethod
+    def get_detail(cls, flight_id: int) -> Optional[Dict[str, Any]]:
+        """获取航班详情，单次查询返回含航线和机型信息的字典"""
+        return db.execute_one(cls._DETAIL_QUERY, (flight_id,))
+    
+    @classmethod
+    async def get_detail_async(cls, flight_id: int, session: Optional[AsyncDatabase] = None) -> Optional[Dict[str, Any]]:
+        """获取航班详情，单次查询返回含航线和机型信息的字典（异步，不带工作单元时合并并发读取）"""
+        if session is None:
+            return await flight_loads.do(
+                ('detail', flight_id), lambda: adb.execute_one(cls._DETAIL_QUERY, (flight_id,))
+            )
+        return await session.execute_one(cls._DETAIL_QUERY, (flight_id,))
     
     def get_route(self) -> Optional[Route]:
         """获取航线信息"""
         return Route.get_by_id(self.route_id)
     
+    async def get_route_async(self, session: Optional[AsyncDatabase] = None) -> Optional[Route]:
+        """获取航线信息（异步）"""
+        return await Route.get_by_id_async(self.route_id, session=session)
+    
     def get_aircraft(self) -> Optional[Aircraft]:
         """获取飞机型号信息"""
         return Aircraft.get_by_id(self.aircraft_id)
     
-    def update_seats(self, seat_class: str, count: int = 1) -> bool:
-        """更新座位数量"""
+    async def get_aircraft_async(self, session: Optional[AsyncDatabase] = None) -> Optional[Aircraft]:
+        """获取飞机型号信息（异步）"""
+        return await Aircraft.get_by_id_async(self.aircraft_id, session=session)
+    
+    @staticmethod
+    def _seat_field(seat_class: str) -> Optional[str]:
+        """舱位对应的余座字段"""
         if seat_class == "经济舱":
-            field = "economy_seats_available"
+            return "economy_seats_available"
         elif seat_class == "商务舱":
-            field = "business_seats_available"
+            return "business_seats_available"
         elif seat_class == "头等舱":
-            field = "first_class_seats_available"
-        else:
+            return "first_class_seats_available"
+        return None
+    
+    def update_seats(self, seat_class: str, count: int = 1) -> bool:
+        """扣减座位数量，余座不足时不扣减并返回 False
+
+        订单流程请使用 app.services.inventory 在订单事务中扣减。
+        """
+        field = self._seat_field(seat_class)
+        if field is None:
             return False
         
-        query = f"UPDATE flights SET {field} = {field} - %s WHERE flight_id = %s"
-        result = db.execute_update(query, (count, self.flight_id))
+        query = f"UPDATE flights SET {field} = {field} - %s WHERE flight_id = %s AND {field} >= %s"
+        result = db.execute_update(query, (count, self.flight_id, count))
+        if result > 0:
+            from app.services.flight_search import invalidate_flight
+            invalidate_flight(self.flight_id)
         return result > 0
 
 
 class Order(BaseModel):
     """订单模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.order_id = kwargs.get('order_id')
-        self.user_id = kwargs.get('user_id')
-        self.flight_id = kwargs.get('flight_id')
-        self.total_price = kwargs.get('total_price')
-        self.payment_status = kwargs.get('payment_status', '待支付')
-        self.trip_status = kwargs.get('trip_status', '待值机')
-        self.created_at = kwargs.get('created_at')
-        self.updated_at = kwargs.get('updated_at')
-        self.payment_method = kwargs.get('payment_method')
-        self.order_number = kwargs.get('order_number')
+    __table__ = 'orders'
+    __primary_key__ = 'order_id'
+    __db_managed__ = ('created_at', 'updated_at')
+    __columns__ = {
+        'order_id': None,
+        'user_id': None,
+        'flight_id': None,
+        'total_price': None,
+        'payment_status': '待支付',
+        'trip_status': '待值机',
+        'created_at': None,
+        'updated_at': None,
+        'payment_method': None,
+        'order_number': None,
+    }
+    # 预加载的航班和乘客
+    __extra_slots__ = {
+        '_flight': _NOT_LOADED,
+        '_passengers': _NOT_LOADED,
+    }
     
     @classmethod
     def get_by_id(cls, order_id: int) -> Optional['Order']:
         """根据ID获取订单"""
         data = db.get_by_id('orders', order_id, 'order_id')
-        return cls(**data) if data else None
+        return cls.from_row(data) if data else None
     
     @classmethod
-    def get_by_user(cls, user_id: int, status: Optional[str] = None) -> List['Order']:
-        """获取用户的订单列表"""
+    async def get_by_id_async(cls, order_id: int, session: Optional[AsyncDatabase] = None) -> Optional['Order']:
+        """根据ID获取订单（异步）"""
+        data = await _adb(session).get_by_id('orders', order_id, 'order_id')
+        return cls.from_row(data) if data else None
+    
+    @staticmethod
+    def _user_orders_query(user_id: int, status: Optional[str] = None):
+        """构造用户订单列表查询"""
         query = "SELECT * FROM orders WHERE user_id = %s"
         params = [user_id]
         
@@ -265,37 +766,116 @@ class Order(BaseModel):
             params.append(status)
         
         query += " ORDER BY created_at DESC"
-        data_list = db.execute_query(query, tuple(params))
-        return [cls(**data) for data in data_list]
+        return query, tuple(params)
+    
+    @classmethod
+    def get_by_user(cls, user_id: int, status: Optional[str] = None) -> List['Order']:
+        """获取用户的订单列表"""
+        query, params = cls._user_orders_query(user_id, status)
+        data_list = db.execute_query(query, params)
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_by_user_async(cls, user_id: int, status: Optional[str] = None, session: Optional[AsyncDatabase] = None) -> List['Order']:
+        """获取用户的订单列表（异步）"""
+        query, params = cls._user_orders_query(user_id, status)
+        data_list = await _adb(session).execute_query(query, params)
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_page_by_user_async(cls, user_id: int, status: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100, session: Optional[AsyncDatabase] = None) -> Tuple[List['Order'], Optional[str]]:
+        """游标分页获取用户的订单，按创建时间倒序，返回 (订单列表, 下一页游标)"""
+        where = "user_id = %s"
+        params = [user_id]
+        if status and status != "all":
+            where += " AND trip_status = %s"
+            params.append(status)
+        data_list, next_cursor = await _adb(session).paginate(
+            "SELECT * FROM orders", "created_at", "order_id",
+            where=where, params=tuple(params), cursor=cursor, limit=limit
+        )
+        return cls.from_rows(data_list), next_cursor
     
     def get_user(self) -> Optional[User]:
         """获取用户信息"""
         return User.get_by_id(self.user_id)
     
+    async def get_user_async(self, session: Optional[AsyncDatabase] = None) -> Optional[User]:
+        """获取用户信息（异步）"""
+        return await User.get_by_id_async(self.user_id, session=session)
+    
     def get_flight(self) -> Optional[Flight]:
-        """获取航班信息"""
+        """获取航班信息（已预加载时直接返回）"""
+        if self._flight is not _NOT_LOADED:
+            return self._flight
         return Flight.get_by_id(self.flight_id)
     
+    async def get_flight_async(self, session: Optional[AsyncDatabase] = None) -> Optional[Flight]:
+        """获取航班信息（异步，已预加载时直接返回）"""
+        if self._flight is not _NOT_LOADED:
+            return self._flight
+        return await Flight.get_by_id_async(self.flight_id, session=session)
+    
     def get_passengers(self) -> List['OrderPassenger']:
-        """获取订单乘客信息"""
-        data_list = db.execute_query(
-            "SELECT * FROM order_passengers WHERE order_id = %s",
-            (self.order_id,)
+        """获取订单乘客信息（已预加载时直接返回）"""
+        if self._passengers is not _NOT_LOADED:
+            return self._passengers
+        return OrderPassenger.get_by_order(self.order_id)
+    
+    async def get_passengers_async(self, session: Optional[AsyncDatabase] = None) -> List['OrderPassenger']:
+        """获取订单乘客信息（异步，已预加载时直接返回）"""
+        if self._passengers is not _NOT_LOADED:
+            return self._passengers
+        return await OrderPassenger.get_by_order_async(self.order_id, session=session)
+    
+    @staticmethod
+    def _relation_loaders() -> Tuple[BatchLoader, BatchLoader]:
+        return (
+            BatchLoader(Flight, 'flights', 'flight_id'),
+            BatchLoader(OrderPassenger, 'order_passengers', 'order_id', many=True),
         )
-        return [OrderPassenger(**data) for data in data_list]
+    
+    @staticmethod
+    def _attach_relations(orders: List['Order'], flights: Dict[Any, Any], passengers: Dict[Any, Any]) -> None:
+        for order in orders:
+            order._flight = flights.get(order.flight_id)
+            order._passengers = passengers.get(order.order_id, [])
+    
+    @classmethod
+    def prefetch_related(cls, orders: List['Order']) -> List['Order']:
+        """批量预加载一组订单的航班和乘客，共两次查询"""
+        if orders:
+            flight_loader, passenger_loader = cls._relation_loaders()
+            flights = flight_loader.load(order.flight_id for order in orders)
+            passengers = passenger_loader.load(order.order_id for order in orders)
+            cls._attach_relations(orders, flights, passengers)
+        return orders
+    
+    @classmethod
+    async def prefetch_related_async(cls, orders: List['Order'], session: Optional[AsyncDatabase] = None) -> List['Order']:
+        """批量预加载一组订单的航班和乘客，共两次查询（异步）"""
+        if orders:
+            flight_loader, passenger_loader = cls._relation_loaders()
+            flights = await flight_loader.load_async((order.flight_id for order in orders), session=session)
+            passengers = await passenger_loader.load_async((order.order_id for order in orders), session=session)
+            cls._attach_relations(orders, flights, passengers)
+        return orders
+    
 
 
 class OrderPassenger(BaseModel):
     """订单乘客模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.passenger_id = kwargs.get('passenger_id')
-        self.order_id = kwargs.get('order_id')
-        self.real_name = kwargs.get('real_name')
-        self.id_card = kwargs.get('id_card')
-        self.phone = kwargs.get('phone')
-        self.seat_class = kwargs.get('seat_class')
+    __table__ = 'order_passengers'
+    __primary_key__ = 'passenger_id'
+    __columns__ = {
+        'passenger_id': None,
+        'order_id': None,
+        'real_name': None,
+        'id_card': None,
+        'phone': None,
+        'seat_class': None,
+    }
     
     @classmethod
     def get_by_order(cls, order_id: int) -> List['OrderPassenger']:
@@ -304,46 +884,79 @@ class OrderPassenger(BaseModel):
             "SELECT * FROM order_passengers WHERE order_id = %s",
             (order_id,)
         )
-        return [cls(**data) for data in data_list]
-    
-    def save(self) -> int:
-        """保存乘客信息"""
-        if self.passenger_id:
-            # 更新
-            data = self.to_dict()
-            data.pop('passenger_id', None)  # 移除id字段
-            return db.update('order_passengers', data, 'passenger_id = %s', (self.passenger_id,))
-        else:
-            # 插入
-            data = self.to_dict()
-            data.pop('passenger_id', None)  # 移除id字段
-            self.passenger_id = db.insert('order_passengers', data)
-            return self.passenger_id
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_by_order_async(cls, order_id: int, session: Optional[AsyncDatabase] = None) -> List['OrderPassenger']:
+        """获取订单的所有乘客（异步）"""
+        data_list = await _adb(session).execute_query(
+            "SELECT * FROM order_passengers WHERE order_id = %s",
+            (order_id,)
+        )
+        return cls.from_rows(data_list)
+    
+    @staticmethod
+    def _assign_ids(passengers: List['OrderPassenger'], ids: List[int]) -> List['OrderPassenger']:
+        for passenger, passenger_id in zip(passengers, ids):
+            passenger.passenger_id = passenger_id
+            passenger.mark_clean()
+        return passengers
+    
+    @classmethod
+    def bulk_create(cls, passengers: List['OrderPassenger']) -> List['OrderPassenger']:
+        """批量插入乘客，并回填 passenger_id"""
+        ids = db.insert_many(cls.__table__, [p._insert_data() for p in passengers])
+        return cls._assign_ids(passengers, ids)
+    
+    @classmethod
+    async def bulk_create_async(cls, passengers: List['OrderPassenger'], session: Optional[AsyncDatabase] = None) -> List['OrderPassenger']:
+        """批量插入乘客，并回填 passenger_id（异步）"""
+        ids = await _adb(session).insert_many(cls.__table__, [p._insert_data() for p in passengers])
+        return cls._assign_ids(passengers, ids)
 
 
 class Notice(BaseModel):
     """通知模型"""
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.notice_id = kwargs.get('notice_id')
-        self.title = kwargs.get('title')
-        self.content = kwargs.get('content')
-        self.type = kwargs.get('type', 'info')
-        self.is_active = kwargs.get('is_active', True)
-        self.created_at = kwargs.get('created_at')
-        self.updated_at = kwargs.get('updated_at')
+    __table__ = 'notices'
+    __primary_key__ = 'notice_id'
+    __db_managed__ = ('created_at', 'updated_at')
+    __columns__ = {
+        'notice_id': None,
+        'title': None,
+        'content': None,
+        'type': 'info',
+        'priority': 'normal',
+        'is_active': True,
+        'created_at': None,
+        'updated_at': None,
+    }
     
     @classmethod
     def get_by_id(cls, notice_id: int) -> Optional['Notice']:
         """根据ID获取通知"""
-        data = db.get_by_id('notices', notice_id, 'notice_id')
-        return cls(**data) if data else None
+        data = db.get_by_id('notices', notice_id, 'notice_id', cache=True)
+        return cls.from_row(data) if data else None
+    
+    @classmethod
+    async def get_by_id_async(cls, notice_id: int, session: Optional[AsyncDatabase] = None) -> Optional['Notice']:
+        """根据ID获取通知（异步）"""
+        data = await _adb(session).get_by_id('notices', notice_id, 'notice_id', cache=True)
+        return cls.from_row(data) if data else None
     
     @classmethod
     def get_active_notices(cls) -> List['Notice']:
         """获取所有活跃的通知"""
         data_list = db.execute_query(
-            "SELECT * FROM notices WHERE is_active = 1 ORDER BY created_at DESC"
+            "SELECT * FROM notices WHERE is_active = 1 ORDER BY created_at DESC", cache=True
+        )
+        return cls.from_rows(data_list)
+    
+    @classmethod
+    async def get_active_notices_async(cls, session: Optional[AsyncDatabase] = None) -> List['Notice']:
+        """获取所有活跃的通知（异步）"""
+        data_list = await _adb(session).execute_query(
+            "SELECT * FROM notices WHERE is_active = 1 ORDER BY created_at DESC", cache=True
         )
-        return [cls(**data) for data in data_list] 
\ No newline at end of file
+        return cls.from_rows(data_list)
+ 
\ No newline at end of file
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/22 上午9:36
+# @File    : query_cache.py
+# @Software: PyCharm
+
+from typing import Any, Hashable, Optional, Tuple
+from functools import lru_cache
+import logging
+import re
+from app.core.cache import TTLCache
+from .config import get_database_config
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+# 无法识别写入表的语句（DDL 等）使用的标签，命中时清空整个缓存
+_ALL_TABLES = "*"
+
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT(?:\s+IGNORE)?\s+INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?",
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=1024)
+def tables_read(query: str) -> Tuple[str, ...]:
+    """查询语句读取的表（FROM / JOIN 之后的表名）"""
+    return tuple(sorted({name.lower() for name in _READ_TABLES.findall(query)}))
+
+
+@lru_cache(maxsize=1024)
+def table_written(query: str) -> str:
+    """写语句的目标表，无法识别时返回 "*\""""
+    match = _WRITE_TABLE.match(query)
+    return match.group(1).lower() if match else _ALL_TABLES
+
+
+class QueryCache:
+    """按 SQL + 参数缓存查询结果，以读取的表为标签，写表时失效
+
+    只缓存调用方显式传入 cache=True 的查询；返回结果的副本，调用方修改不会影响缓存。
+    只在当前 worker 进程内生效，其他进程的写入要等 TTL 过期后才可见。
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 60, enabled: bool = True):
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="query")
+
+    def lookup(self, query: str, params: Any) -> Tuple[Optional[Tuple[Hashable, int]], Any]:
+        """返回 (回填令牌, 结果)，未命中时结果为 _MISS，无法缓存时令牌为 None
+
+        令牌记录查询前的失效序号，回填时若涉及的表在查询期间被写入失效，则不写入缓存。
+        """
+        if not self.enabled:
+            return None, _MISS
+        if isinstance(params, list):
+            params = tuple(params)
+        key = (query, params)
+        try:
+            hash(key)
+        except TypeError:
+            return None, _MISS
+        return (key, self._cache.generation()), _copy(self._cache.get(key, _MISS))
+
+    def store(self, token: Optional[Tuple[Hashable, int]], query: str, result: Any) -> Any:
+        """写入缓存并返回结果副本"""
+        if token is None:
+            return result
+        key, since = token
+        self._cache.set(key, result, tags=tables_read(query), since=since)
+        return _copy(result)
+
+    def invalidate_table(self, table: str) -> int:
+        if table == _ALL_TABLES:
+            count = len(self._cache)
+            self._cache.clear()
+            return count
+        return self._cache.invalidate_tag(table.lower())
+
+    def invalidate_query(self, query: str) -> int:
+        """按写语句的目标表失效"""
+        return self.invalidate_table(table_written(query))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return {"enabled": self.enabled, **self._cache.stats()}
+
+
+def _copy(result: Any) -> Any:
+    if isinstance(result, list):
+        return [dict(row) for row in result]
+    if isinstance(result, dict):
+        return dict(result)
+    return result
+
+
+def is_miss(result: Any) -> bool:
+    return result is _MISS
+
+
+def _create_query_cache() -> QueryCache:
+    config = get_database_config()
+    return QueryCache(
+        maxsize=config["query_cache_size"],
+        ttl=config["query_cache_ttl"],
+        enabled=config["query_cache_enabled"],
+    )
+
+
+# 创建全局查询缓存实例（同步、异步数据库共用）
+query_cache = _create_query_cache()
+
+
+def get_query_cache() -> QueryCache:
+    """获取查询结果缓存实例"""
+    return query_cache
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/21 下午4:18
+# @File    : query_stats.py
+# @Software: PyCharm
+
+from typing import Any, Callable, Dict, List, Optional
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+import logging
+import re
+import threading
+import time
+from .config import get_database_config
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.database.slow_query")
+
+# 耗时直方图的桶上界（毫秒），最后一个桶收纳更慢的查询
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# 每条语句最多记录的调用路由数
+MAX_ROUTES_PER_FINGERPRINT = 20
+# 超出语句指纹上限后归并到这个键
+OVERFLOW_FINGERPRINT = "<other>"
+
+# 当前请求的 ASGI scope（由 QueryRouteMiddleware 设置），同步查询在线程池中也能读到
+current_request: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_request", default=None)
+
+
+class QueryRouteMiddleware:
+    """纯 ASGI 中间件：在请求处理期间设置 current_request，供查询统计按路由模板归类
+
+    不经过 BaseHTTPMiddleware，不额外包装任务和响应流（流式导出不受影响）；
+    路由匹配结果会写回同一个 scope。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_MULTI_ROW = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """把 SQL 归一化为语句指纹：字面量与占位符替换为 ?，IN 列表与多行 VALUES 折叠"""
+    text = _STRING_LITERAL.sub("?", query)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _VALUE_LIST.sub("(?+)", text)
+    return _MULTI_ROW.sub("(?+),...", text)
+
+
+def describe_route(scope: Optional[Dict[str, Any]]) -> str:
+    """返回请求的路由模板（如 GET /api/orders/{order_id}），路由匹配前退回原始路径"""
+    if scope is None:
+        return "<background>"
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def redact_params(params: Any) -> Any:
+    """参数脱敏，只保留类型与长度"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_params(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact_params(value) for value in params]
+    if isinstance(params, (str, bytes)):
+        return f"<{type(params).__name__}:{len(params)}>"
+    return f"<{type(params).__name__}>"
+
+
+class _FingerprintStats:
+    """单个语句指纹的累计数据"""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "rows", "buckets", "routes")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.routes: Counter = Counter()
+
+    def percentile(self, ratio: float) -> Optional[float]:
+        """按直方图估算分位数（返回所在桶的上界）"""
+        target = self.count * ratio
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return None
+
+    def to_dict(self, fingerprint_text: str) -> Dict[str, Any]:
+        return {
+            "fingerprint": fingerprint_text,
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "rows": self.rows,
+            "histogram": {
+                **{f"<={bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                f">{LATENCY_BUCKETS_MS[-1]}ms": self.buckets[-1],
+            },
+            "routes": dict(self.routes.most_common()),
+        }
+
+
+class QueryStats:
+    """按语句指纹统计查询耗时、返回行数和调用路由，超过阈值的查询写入慢查询日志
+
+    统计只在当前 worker 进程内累计。
+    """
+
+    def __init__(self, slow_query_ms: float = 200, max_fingerprints: int = 500, enabled: bool = True):
+        self.slow_query_ms = slow_query_ms
+        self.max_fingerprints = max_fingerprints
+        self.enabled = enabled
+        self._stats: Dict[str, _FingerprintStats] = {}
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[str, Any, float, int, bool], None]] = []
+        self.slow_queries = 0
+        self.started_at = time.time()
+
+    def add_hook(self, hook: Callable[[str, Any, float, int, bool], None]) -> None:
+        """注册查询回调 hook(query, params, elapsed_ms, rows, error)"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[str, Any, float, int, bool], None]) -> None:
+        if hook in self._hooks:
+            self._hooks.remove(hook)
+
+    def record(self, query: str, params: Any, elapsed_ms: float, rows: int = 0, error: bool = False) -> None:
+        """记录一次查询"""
+        if not self.enabled:
+            return
+        rows = rows or 0
+        key = fingerprint(query)
+        route = describe_route(current_request.get())
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS_MS) and elapsed_ms > LATENCY_BUCKETS_MS[bucket]:
+            bucket += 1
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                # 指纹数已达上限时计入溢出桶，慢查询日志仍输出真实指纹
+                bucket_key = OVERFLOW_FINGERPRINT if len(self._stats) >= self.max_fingerprints else key
+                stats = self._stats.setdefault(bucket_key, _FingerprintStats())
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.rows += rows
+            stats.buckets[bucket] += 1
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            if error:
+                stats.errors += 1
+            if route in stats.routes or len(stats.routes) < MAX_ROUTES_PER_FINGERPRINT:
+                stats.routes[route] += 1
+
+        if elapsed_ms >= self.slow_query_ms:
+            self.slow_queries += 1
+            slow_query_logger.warning(
+                f"慢查询 {elapsed_ms:.1f}ms [{route}] {key} 参数: {redact_params(params)} 行数: {rows}"
+            )
+
+        for hook in self._hooks:
+            try:
+                hook(query, params, elapsed_ms, rows, error)
+            except Exception as e:
+                logger.error(f"查询回调执行失败: {e}")
+
+    def track(self, query: str, params: Any = None) -> "QueryTimer":
+        """返回计时上下文，在 with 块内执行查询并设置 rows"""
+        return QueryTimer(self, query, params)
+
+    def snapshot(self, limit: int = 50, sort: str = "total_ms") -> Dict[str, Any]:
+        """按指定字段降序返回前 limit 个语句指纹的统计"""
+        with self._lock:
+            items = [stats.to_dict(key) for key, stats in self._stats.items()]
+        items.sort(key=lambda item: item.get(sort) or 0, reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "fingerprints": len(items),
+            "queries": sum(item["count"] for item in items),
+            "since": self.started_at,
+            "statements": items[:limit],
+        }
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries = 0
+            self.started_at = time.time()
+
+
+class QueryTimer:
+    """单次查询的计时上下文，异常退出时记为失败"""
+
+    __slots__ = ("stats", "query", "params", "rows", "_start")
+
+    def __init__(self, stats: QueryStats, query: str, params: Any):
+        self.stats = stats
+        self.query = query
+        self.params = params
+        self.rows = 0
+
+    def __enter__(self) -> "QueryTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self.stats.record(self.query, self.params, elapsed_ms, self.rows, exc_type is not None)
+
+
+def _create_query_stats() -> QueryStats:
+    config = get_database_config()
+    return QueryStats(
+        slow_query_ms=config["slow_query_ms"],
+        max_fingerprints=config["query_stats_max_fingerprints"],
+        enabled=config["query_stats_enabled"],
+    )
+
+
+# 创建全局查询统计实例
+query_stats = _create_query_stats()
+
+
+def get_query_stats() -> QueryStats:
+    """获取查询统计实例"""
+    return query_stats
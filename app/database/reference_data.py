@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/22 下午4:18
+# @File    : reference_data.py
+# @Software: PyCharm
+
+from typing import List, Dict, Any, Optional
+import asyncio
+import logging
+import time
+from .config import settings
+from .database import get_database
+from .async_database import get_async_database
+
+logger = logging.getLogger(__name__)
+
+
+class _Snapshot:
+    """一次完整加载的参考数据，整体替换，读取时无需加锁"""
+
+    __slots__ = ("routes", "routes_by_cities", "aircraft", "loaded_at")
+
+    def __init__(self, routes: List[Dict[str, Any]], aircraft: List[Dict[str, Any]]):
+        self.routes = {row["route_id"]: row for row in routes}
+        self.routes_by_cities = {(row["departure_city"], row["arrival_city"]): row for row in routes}
+        self.aircraft = {row["aircraft_id"]: row for row in aircraft}
+        self.loaded_at = time.time()
+
+
+class ReferenceDataCache:
+    """航线和机型的进程内缓存
+
+    两张表几乎不变，启动时整表加载到字典，之后按固定间隔后台刷新，
+    也可以通过管理接口立即刷新（只作用于接收请求的 worker 进程）。
+    未加载或未命中时返回 None，由调用方回退到数据库查询。
+    """
+
+    def __init__(self, refresh_interval: int):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[_Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def load(self) -> None:
+        """同步加载全部参考数据"""
+        db = get_database()
+        self._snapshot = _Snapshot(db.get_all("routes"), db.get_all("aircraft"))
+        logger.info(f"参考数据已加载: 航线 {len(self._snapshot.routes)} 条, 机型 {len(self._snapshot.aircraft)} 种")
+
+    async def load_async(self) -> None:
+        """异步加载全部参考数据"""
+        adb = get_async_database()
+        self._snapshot = _Snapshot(await adb.get_all("routes"), await adb.get_all("aircraft"))
+        logger.info(f"参考数据已加载: 航线 {len(self._snapshot.routes)} 条, 机型 {len(self._snapshot.aircraft)} 种")
+
+    def invalidate(self) -> None:
+        """清空缓存，之后的查询回退到数据库直到下次加载"""
+        self._snapshot = None
+
+    def get_route(self, route_id: int) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        return snapshot.routes.get(route_id) if snapshot else None
+
+    def get_route_by_cities(self, departure_city: str, arrival_city: str) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        return snapshot.routes_by_cities.get((departure_city, arrival_city)) if snapshot else None
+
+    def get_all_routes(self) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self._snapshot
+        return list(snapshot.routes.values()) if snapshot else None
+
+    def get_aircraft(self, aircraft_id: int) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        return snapshot.aircraft.get(aircraft_id) if snapshot else None
+
+    def get_all_aircraft(self) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self._snapshot
+        return list(snapshot.aircraft.values()) if snapshot else None
+
+    def status(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "routes": len(snapshot.routes) if snapshot else 0,
+            "aircraft": len(snapshot.aircraft) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "refresh_interval": self.refresh_interval,
+        }
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load_async()
+            except Exception as e:
+                # 刷新失败时继续使用旧数据
+                logger.error(f"参考数据刷新失败: {e}")
+
+    async def start(self) -> None:
+        """加载参考数据并启动定时刷新"""
+        try:
+            await self.load_async()
+        except Exception as e:
+            logger.error(f"参考数据加载失败，将回退到数据库查询: {e}")
+        if self.refresh_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """停止定时刷新"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 创建全局参考数据缓存实例
+reference_cache = ReferenceDataCache(settings.database.database_reference_refresh_interval)
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    """获取参考数据缓存实例"""
+    return reference_cache
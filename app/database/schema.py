@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/21 上午11:26
+# @File    : schema.py
+# @Software: PyCharm
+
+from typing import List, Tuple
+import logging
+from .database import get_database
+
+logger = logging.getLogger(__name__)
+
+# 热点查询依赖的二级索引：(表名, 索引名, 列)
+# 等值条件列在前、范围/排序列在后
+EXPECTED_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("flights", "idx_flights_route_status_departure", ("route_id", "status", "departure_time")),
+    ("orders", "idx_orders_user_created", ("user_id", "created_at")),
+    ("order_passengers", "idx_order_passengers_order", ("order_id",)),
+    ("flights", "idx_flights_departure", ("departure_time",)),
+    ("users", "idx_users_created", ("created_at",)),
+    ("orders", "idx_orders_payment_created", ("payment_status", "created_at")),
+    ("revoked_tokens", "idx_revoked_tokens_revoked", ("revoked_at",)),
+    ("revoked_tokens", "idx_revoked_tokens_expires", ("expires_at",)),
+    ("users", "idx_users_email", ("email",)),
+    ("users", "idx_users_phone", ("phone",)),
+]
+
+
+def get_existing_indexes(table: str) -> List[str]:
+    """获取表上已有的索引名"""
+    rows = get_database().execute_query(
+        """
+        SELECT DISTINCT index_name AS index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        """,
+        (table,)
+    )
+    return [row["index_name"] for row in rows]
+
+
+def get_missing_indexes() -> List[Tuple[str, str, Tuple[str, ...]]]:
+    """返回尚未创建的预期索引"""
+    missing = []
+    existing = {}
+    for table, index_name, columns in EXPECTED_INDEXES:
+        if table not in existing:
+            existing[table] = set(get_existing_indexes(table))
+        if index_name not in existing[table]:
+            missing.append((table, index_name, columns))
+    return missing
+
+
+def check_indexes() -> bool:
+    """启动时检查预期索引，缺失时记录警告"""
+    try:
+        missing = get_missing_indexes()
+    except Exception as e:
+        logger.warning(f"索引检查失败: {e}")
+        return False
+    for table, index_name, columns in missing:
+        logger.warning(f"⚠️  缺少索引 {table}.{index_name} ({', '.join(columns)})")
+    if missing:
+        logger.warning("请运行: python database_configure/migrate.py")
+    return not missing
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/19 上午10:12
+# @File    : session.py
+# @Software: PyCharm
+
+from typing import Optional, AsyncIterator, Callable, List
+from contextlib import asynccontextmanager, AsyncExitStack
+import logging
+import aiomysql
+from .async_database import AsyncDatabase, get_async_database
+from .query_cache import query_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork(AsyncDatabase):
+    """请求级工作单元
+
+    复用 AsyncDatabase 的全部查询方法，但所有语句都在同一条连接、同一个事务中执行。
+    连接在第一次执行语句时才从连接池取出；正常退出时提交，抛出异常时回滚。
+    同一个工作单元不能被多个协程并发使用。
+    事务中一旦有写入，之后的读取不再经过查询缓存，避免把未提交的数据写进缓存；
+    只有开启事务的第一条语句（快照即在此时建立）的结果会回填缓存。
+    """
+
+    def __init__(self, db: Optional[AsyncDatabase] = None):
+        self._db = db or get_async_database()
+        self.config = self._db.config
+        self._stack: Optional[AsyncExitStack] = None
+        self._conn: Optional[aiomysql.Connection] = None
+        self._in_transaction = False
+        self._after_commit: List[Callable[[], None]] = []
+        self._wrote = False
+
+    async def __aenter__(self) -> "UnitOfWork":
+        self._stack = AsyncExitStack()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            self._conn = None
+            self._in_transaction = False
+            await self._stack.aclose()
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncIterator[aiomysql.Connection]:
+        """返回工作单元持有的连接，按需取出连接并开启事务"""
+        if self._stack is None:
+            raise RuntimeError("工作单元尚未开始，请在 async with 中使用")
+        if self._conn is None:
+            self._conn = await self._stack.enter_async_context(self._db.get_connection())
+        if not self._in_transaction:
+            await self._conn.begin()
+            self._in_transaction = True
+        yield self._conn
+
+    async def _get_auto_increment_step(self, cursor: aiomysql.Cursor) -> int:
+        # 步长缓存在连接池级实例上，不必每个工作单元都查一次
+        return await self._db._get_auto_increment_step(cursor)
+
+    def stream_query(self, query: str, params=None, batch_size: int = 1000):
+        """流式查询会独占连接，始终在连接池的独立连接上执行，不参与本事务"""
+        return self._db.stream_query(query, params, batch_size)
+
+    def _cache_readable(self) -> bool:
+        return not self._wrote
+
+    def _cache_storable(self) -> bool:
+        """事务已开始时不回填缓存：REPEATABLE READ 快照可能早于其他请求已提交并失效的写入"""
+        return not self._wrote and not self._in_transaction
+
+    def _invalidate(self, table: str) -> None:
+        """写入时立即失效，提交后再失效一次，清掉事务期间其他请求读入的旧数据"""
+        self._wrote = True
+        query_cache.invalidate_table(table)
+        self.after_commit(lambda: query_cache.invalidate_table(table))
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """注册在事务提交成功后执行的回调（如缓存失效），回滚时丢弃"""
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        """提交当前事务；之后的语句会开启新事务"""
+        if self._in_transaction:
+            await self._conn.commit()
+            self._in_transaction = False
+        self._wrote = False
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"提交后回调执行失败: {e}")
+
+    async def rollback(self) -> None:
+        """回滚当前事务"""
+        self._after_commit = []
+        self._wrote = False
+        if self._in_transaction:
+            self._in_transaction = False
+            try:
+                await self._conn.rollback()
+            except Exception as e:
+                logger.error(f"事务回滚失败: {e}")
+
+
+async def get_session() -> AsyncIterator[UnitOfWork]:
+    """FastAPI 依赖：为每个请求提供一个工作单元"""
+    async with UnitOfWork() as session:
+        yield session
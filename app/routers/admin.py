@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import date, datetime
+from app.database.models import User
+from app.database.reference_data import get_reference_cache
+from app.database.query_stats import get_query_stats
+from app.database.query_cache import get_query_cache
+from app.services.flight_search import get_search_cache_stats
+from app.services import export
+from app.services.order_expiry import get_order_expiry
+from app.services.token_revocation import get_token_revocation
+from app.services.password_hasher import get_password_hasher
+from app.core.security import get_current_admin, get_token_cache_stats
+from app.core.auth_cache import get_principal_cache
+
+router = APIRouter()
+
+
+@router.get("/cache/reference")
+async def get_reference_cache_status(current_user: User = Depends(get_current_admin)):
+    """查看航线/机型缓存状态"""
+    return get_reference_cache().status()
+
+
+@router.get("/cache/flight-search")
+async def get_flight_search_cache_stats(current_user: User = Depends(get_current_admin)):
+    """查看航班搜索缓存命中统计"""
+    return get_search_cache_stats()
+
+
+@router.get("/cache/query")
+async def get_query_cache_stats(current_user: User = Depends(get_current_admin)):
+    """查看数据库查询结果缓存命中统计"""
+    return get_query_cache().stats()
+
+
+@router.post("/cache/query/clear")
+async def clear_query_cache(current_user: User = Depends(get_current_admin)):
+    """清空查询结果缓存（仅作用于当前 worker 进程）"""
+    get_query_cache().clear()
+    return {"message": "查询缓存已清空"}
+
+
+@router.get("/cache/principal")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_admin)):
+    """查看已认证用户缓存命中统计"""
+    return get_principal_cache().stats()
+
+
+@router.get("/cache/token")
+async def get_token_cache_status(current_user: User = Depends(get_current_admin)):
+    """查看已验证令牌缓存命中统计"""
+    return get_token_cache_stats()
+
+
+@router.post("/cache/reference/refresh")
+async def refresh_reference_cache(current_user: User = Depends(get_current_admin)):
+    """立即重新加载航线/机型缓存（仅作用于当前 worker 进程）"""
+    cache = get_reference_cache()
+    try:
+        await cache.load_async()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"刷新参考数据失败: {str(e)}"
+        )
+    return {"message": "参考数据已刷新", **cache.status()}
+
+
+@router.get("/query-stats")
+async def get_query_statistics(
+    limit: int = Query(50, ge=1, le=500, description="返回的语句数"),
+    sort: str = Query("total_ms", pattern="^(total_ms|count|avg_ms|max_ms|p95_ms|rows|errors)$", description="排序字段"),
+    current_user: User = Depends(get_current_admin)
+):
+    """按语句指纹查看查询耗时统计（仅当前 worker 进程）"""
+    return get_query_stats().snapshot(limit=limit, sort=sort)
+
+
+@router.post("/query-stats/reset")
+async def reset_query_statistics(current_user: User = Depends(get_current_admin)):
+    """清空查询统计"""
+    get_query_stats().reset()
+    return {"message": "查询统计已清空"}
+
+
+@router.get("/order-expiry")
+async def get_order_expiry_stats(current_user: User = Depends(get_current_admin)):
+    """查看超时订单取消与退座统计（仅当前 worker 进程）"""
+    return get_order_expiry().stats()
+
+
+@router.post("/order-expiry/run")
+async def run_order_expiry(current_user: User = Depends(get_current_admin)):
+    """立即执行一次超时订单取消"""
+    expired = await get_order_expiry().run_once()
+    return {"message": f"已取消 {expired} 个超时订单", **get_order_expiry().stats()}
+
+
+@router.get("/token-revocation")
+async def get_token_revocation_stats(current_user: User = Depends(get_current_admin)):
+    """查看已吊销令牌的内存过滤器与同步状态（仅当前 worker 进程）"""
+    return get_token_revocation().stats()
+
+
+@router.get("/password-hasher")
+async def get_password_hasher_stats(current_user: User = Depends(get_current_admin)):
+    """查看密码哈希进程池的排队与校验统计（仅当前 worker 进程）"""
+    return get_password_hasher().stats()
+
+
+def _export_response(name: str, query: str, params: tuple, columns: list, fmt: str) -> StreamingResponse:
+    content, meta = export.export_stream(query, params, columns, fmt)
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{meta['extension']}"
+    return StreamingResponse(
+        content,
+        media_type=meta["media_type"],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/export/orders")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson 或 csv"),
+    start_date: Optional[date] = Query(None, description="创建日期起（含）"),
+    end_date: Optional[date] = Query(None, description="创建日期止（含）"),
+    current_user: User = Depends(get_current_admin)
+):
+    """流式导出订单（内存占用与数据量无关）"""
+    query, params = export.orders_query(start_date, end_date)
+    return _export_response("orders", query, params, export.ORDER_EXPORT_COLUMNS, format)
+
+
+@router.get("/export/flights")
+async def export_flights(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson 或 csv"),
+    current_user: User = Depends(get_current_admin)
+):
+    """流式导出航班（内存占用与数据量无关）"""
+    query, params = export.flights_query()
+    return _export_response("flights", query, params, export.FLIGHT_EXPORT_COLUMNS, format)
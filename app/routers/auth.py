@@ -3,18 +3,27 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials
 from app.schemas.user import UserRegisterRequest, UserLoginRequest, LoginResponse, UserResponse
 from app.database.models import User
-from app.core.security import get_password_hash, verify_password, create_user_token, get_current_user, security
+from app.database.session import UnitOfWork, get_session
+from app.services.token_revocation import get_token_revocation
+from app.core.security import get_password_hash, verify_password, create_user_token, get_current_user, get_current_claims, TokenPrincipal, security
+from app.services.password_hasher import get_password_hasher, PasswordHasherBusy
 from typing import Optional
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegisterRequest):
-    """用户注册（明文密码存储）"""
+    """用户注册（密码以 scrypt 哈希存储）
+
+    查重在连接池上直接执行，计算哈希期间不占用数据库连接，只在写入时开启工作单元。
+    """
     try:
         # 检查用户名是否已存在
-        existing_user = User.get_by_username(user_data.username)
+        existing_user = await User.get_by_username_async(user_data.username)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,7 +31,7 @@ async def register(user_data: UserRegisterRequest):
             )
         
         # 检查邮箱是否已存在
-        existing_email = User.get_by_email(user_data.email)
+        existing_email = await User.get_by_email_async(user_data.email)
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,30 +39,31 @@ async def register(user_data: UserRegisterRequest):
             )
         
         # 检查身份证号是否已存在
-        existing_id_card = User.get_by_id_card(user_data.id_card)
+        existing_id_card = await User.get_by_id_card_async(user_data.id_card)
         if existing_id_card:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="身份证号已被注册"
             )
         
-        # 明文存储密码
+        # 存储密码哈希
         new_user = User(
             username=user_data.username,
             email=user_data.email,
-            password=user_data.password,  # 明文
+            password=await get_password_hash(user_data.password),
             phone=user_data.phone,
             id_card=user_data.id_card,
             real_name=user_data.real_name,
             gender=user_data.gender,
             age=user_data.age,
-            user_type=user_data.user_type,
+            user_type="passenger",  # 注册只能创建乘客账户，管理员不能自助注册
             vip_level=0,
             created_at=datetime.now()
         )
         
         # 保存用户
-        user_id = new_user.save()
+        async with UnitOfWork() as session:
+            user_id = await new_user.save_async(session=session)
         
         return {
             "message": "注册成功",
@@ -63,6 +73,11 @@ async def register(user_data: UserRegisterRequest):
         
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -71,27 +86,34 @@ async def register(user_data: UserRegisterRequest):
 
 @router.post("/login", response_model=LoginResponse)
 async def login(user_data: UserLoginRequest):
-    """用户登录（支持用户名、邮箱、手机号，明文密码比对）"""
+    """用户登录（支持用户名、邮箱、手机号；明文存储的旧密码校验通过后升级为哈希）
+
+    查找用户在连接池上直接执行，校验密码期间不占用数据库连接，只在升级哈希时开启工作单元。
+    """
     try:
-        # 先按用户名查找
-        user = User.get_by_username(user_data.username)
-        # 如果不是用户名，再按邮箱
-        if not user:
-            user = User.get_by_email(user_data.username)
-        # 如果还不是，再按手机号
-        if not user:
-            user = User.get_by_phone(user_data.username)
+        # 按格式识别用户名/邮箱/手机号，一次查询
+        user = await User.find_by_login_identifier_async(user_data.username)
         if not user:
+            # 同样执行一次校验，避免通过响应耗时判断账户是否存在
+            await get_password_hasher().verify_dummy(user_data.password)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名/邮箱/手机号或密码错误"
             )
-        # 明文比对密码
-        if user_data.password != user.password:
+        matched, new_hash = await get_password_hasher().verify(user_data.password, user.password)
+        if not matched:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="用户名/邮箱/手机号或密码错误"
             )
+        if new_hash is not None:
+            # 明文或旧参数的密码升级为当前哈希；期间密码被修改或保存失败都不影响本次登录
+            user.password = new_hash
+            try:
+                async with UnitOfWork() as session:
+                    await user.save_async(session=session, guard=True)
+            except Exception as e:
+                logger.warning(f"用户 {user.id} 密码哈希升级失败: {e}")
         # 补全 created_at
         created_at = user.created_at or datetime.now()
         user_response = UserResponse(
@@ -117,6 +139,11 @@ async def login(user_data: UserLoginRequest):
         )
     except HTTPException:
         raise
+    except PasswordHasherBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,10 +152,25 @@ async def login(user_data: UserLoginRequest):
 
 
 @router.post("/logout")
-async def logout(current_user: User = Depends(get_current_user)):
-    """用户登出"""
-    # 在实际应用中，可以将token加入黑名单
-    return {"message": "登出成功"}
+async def logout(
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
+):
+    """用户登出：吊销当前令牌，之后使用该令牌的请求返回 401"""
+    if current_user.jti is None:
+        # 不带 jti 的旧令牌无法吊销，到期后自然失效
+        return {"message": "登出成功"}
+    try:
+        await get_token_revocation().revoke(
+            current_user.jti, current_user.id, current_user.expires_at, session=session
+        )
+        await session.commit()
+        return {"message": "登出成功"}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"登出失败: {str(e)}"
+        )
 
 
 @router.get("/me", response_model=UserResponse)
@@ -24,7 +24,7 @@ class NoticeResponse(BaseModel):
 async def get_notices():
     """获取所有活跃通知"""
     try:
-        notices = Notice.get_active_notices()
+        notices = await Notice.get_active_notices_async()
         
         notice_list = []
         for notice in notices:
@@ -53,7 +53,7 @@ async def get_notices():
 async def get_notice(notice_id: int):
     """获取通知详情"""
     try:
-        notice = Notice.get_by_id(notice_id)
+        notice = await Notice.get_by_id_async(notice_id)
         if not notice:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from app.database.models import Order, OrderPassenger, User, Flight
-from app.core.security import get_current_user
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from app.database.models import Order, OrderPassenger, Flight
+from app.core.security import get_current_claims, TokenPrincipal
+from app.database.session import UnitOfWork, get_session
+from app.services.inventory import reserve_seats, count_by_class, InsufficientSeatsError
+from app.services import order_state
+from app.core.idgen import new_order_number
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-import uuid
 
 router = APIRouter()
 
@@ -42,32 +45,26 @@ class OrderResponse(BaseModel):
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: CreateOrderRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
     """创建订单"""
     try:
         # 获取航班信息
-        flight = Flight.get_by_id(order_data.flight_id)
+        flight = await Flight.get_by_id_async(order_data.flight_id, session=session)
         if not flight:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="航班不存在"
             )
         
-        # 检查座位可用性
         seat_prices = {
             "经济舱": flight.economy_price,
             "商务舱": flight.business_price,
             "头等舱": flight.first_class_price
         }
         
-        seat_availability = {
-            "经济舱": flight.economy_seats_available,
-            "商务舱": flight.business_seats_available,
-            "头等舱": flight.first_class_seats_available
-        }
-        
-        # 计算总价并检查座位
+        # 计算总价（余座在扣减时由数据库条件更新校验）
         total_price = 0
         for passenger in order_data.passengers:
             seat_class = passenger.seat_class
@@ -77,16 +74,10 @@ async def create_order(
                     detail=f"无效的座位类型: {seat_class}"
                 )
             
-            if seat_availability[seat_class] <= 0:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"{seat_class}座位不足"
-                )
-            
             total_price += seat_prices[seat_class]
         
-        # 生成订单号
-        order_number = f"ORD{datetime.now().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8].upper()}"
+        # 生成订单号（按时间递增，唯一索引只在末尾追加）
+        order_number = new_order_number()
         
         # 创建订单
         new_order = Order(
@@ -96,22 +87,27 @@ async def create_order(
             payment_status="待支付",
             trip_status="待值机",
             payment_method=order_data.payment_method,
-            order_number=order_number
+            order_number=order_number,
+            created_at=datetime.now()
         )
         
-        order_id = new_order.save()
+        order_id = await new_order.save_async(session=session)
         
-        # 创建乘客信息
-        passengers_data = []
-        for passenger in order_data.passengers:
-            passenger_record = OrderPassenger(
+        # 创建乘客信息（一条多行 INSERT 写入）
+        passenger_records = [
+            OrderPassenger(
                 order_id=order_id,
                 real_name=passenger.real_name,
                 id_card=passenger.id_card,
                 phone=passenger.phone,
                 seat_class=passenger.seat_class
             )
-            passenger_record.save()
+            for passenger in order_data.passengers
+        ]
+        await OrderPassenger.bulk_create_async(passenger_records, session=session)
+        
+        passengers_data = []
+        for passenger in order_data.passengers:
             passengers_data.append({
                 "real_name": passenger.real_name,
                 "id_card": passenger.id_card,
@@ -119,9 +115,18 @@ async def create_order(
                 "seat_class": passenger.seat_class
             })
         
-        # 更新航班座位数量
-        for passenger in order_data.passengers:
-            flight.update_seats(passenger.seat_class, 1)
+        # 按舱位扣减座位，放在最后以缩短航班行锁的持有时间
+        seat_counts = count_by_class(p.seat_class for p in order_data.passengers)
+        try:
+            await reserve_seats(session, flight.flight_id, seat_counts)
+        except InsufficientSeatsError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        
+        # 订单、乘客和座位在同一事务中提交
+        await session.commit()
         
         # 构建响应数据
         flight_info = {
@@ -157,17 +162,26 @@ async def create_order(
 
 @router.get("/", response_model=List[OrderResponse])
 async def get_user_orders(
-    status: Optional[str] = None,
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    trip_status: Optional[str] = Query(None, alias="status", description="行程状态，all 表示全部"),
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页响应头 X-Next-Cursor"),
+    limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
-    """获取用户订单列表"""
+    """获取用户订单列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
     try:
-        orders = Order.get_by_user(current_user.id, status)
+        orders, next_cursor = await Order.get_page_by_user_async(
+            current_user.id, trip_status, cursor=cursor, limit=limit, session=session
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        await Order.prefetch_related_async(orders, session=session)
         
         order_list = []
         for order in orders:
-            flight = order.get_flight()
-            passengers = order.get_passengers()
+            flight = await order.get_flight_async(session=session)
+            passengers = await order.get_passengers_async(session=session)
             
             passengers_data = [
                 {
@@ -204,6 +218,11 @@ async def get_user_orders(
         
         return order_list
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -214,11 +233,12 @@ async def get_user_orders(
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
     """获取订单详情"""
     try:
-        order = Order.get_by_id(order_id)
+        order = await Order.get_by_id_async(order_id, session=session)
         if not order:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -232,8 +252,9 @@ async def get_order(
                 detail="无权访问此订单"
             )
         
-        flight = order.get_flight()
-        passengers = order.get_passengers()
+        await Order.prefetch_related_async([order], session=session)
+        flight = await order.get_flight_async(session=session)
+        passengers = await order.get_passengers_async(session=session)
         
         passengers_data = [
             {
@@ -276,40 +297,31 @@ async def get_order(
         )
 
 
+def _transition_error(e: order_state.OrderTransitionError, invalid_detail: str) -> HTTPException:
+    """把状态迁移失败原因转换为 HTTP 错误"""
+    if e.reason == "not_found":
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="订单不存在")
+    if e.reason == "forbidden":
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权操作此订单")
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=invalid_detail)
+
+
 @router.post("/{order_id}/pay")
 async def pay_order(
     order_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
-    """支付订单"""
+    """支付订单（单条条件更新，重复支付只有一次生效）"""
     try:
-        order = Order.get_by_id(order_id)
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="订单不存在"
-            )
-        
-        if order.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="无权操作此订单"
-            )
-        
-        if order.payment_status == "已支付":
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="订单已支付"
-            )
-        
-        # 更新支付状态
-        order.payment_status = "已支付"
-        order.save()
+        await order_state.pay(session, order_id, current_user.id)
+        await session.commit()
         
         return {"message": "支付成功"}
         
-    except HTTPException:
-        raise
+    except order_state.OrderTransitionError as e:
+        paid = e.order and e.order["payment_status"] == order_state.PAYMENT_PAID
+        raise _transition_error(e, "订单已支付" if paid else "订单状态不允许支付")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -320,45 +332,18 @@ async def pay_order(
 @router.post("/{order_id}/cancel")
 async def cancel_order(
     order_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
-    """取消订单"""
+    """取消订单，同一事务中退还座位"""
     try:
-        order = Order.get_by_id(order_id)
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="订单不存在"
-            )
-        
-        if order.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="无权操作此订单"
-            )
-        
-        if order.trip_status in ["已完成", "已取消"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="订单状态不允许取消"
-            )
-        
-        # 更新订单状态
-        order.trip_status = "已取消"
-        order.save()
-        
-        # 退还座位
-        passengers = order.get_passengers()
-        flight = order.get_flight()
-        if flight:
-            for passenger in passengers:
-                # 这里需要实现退还座位的逻辑
-                pass
+        await order_state.cancel(session, order_id, current_user.id)
+        await session.commit()
         
         return {"message": "订单取消成功"}
         
-    except HTTPException:
-        raise
+    except order_state.OrderTransitionError as e:
+        raise _transition_error(e, "订单状态不允许取消")
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
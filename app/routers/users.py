@@ -1,22 +1,28 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
 from app.schemas.user import UserResponse, UserUpdateRequest
 from app.database.models import User
-from app.core.security import get_current_user, get_password_hash
-from typing import List
+from app.database.session import UnitOfWork, get_session
+from app.core.security import get_current_user, get_current_claims, TokenPrincipal, get_password_hash
+from typing import List, Optional
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="分页游标，取上一页响应头 X-Next-Cursor"),
+    skip: int = Query(0, ge=0, description="跳过记录数（已弃用，请使用 cursor）"),
+    limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
-    """获取用户列表（管理员功能）"""
+    """获取用户列表（管理员功能，游标分页，下一页游标见响应头 X-Next-Cursor）"""
     # 这里可以添加管理员权限检查
     try:
-        users = User.get_all(skip=skip, limit=limit)
+        users, next_cursor = await User.get_page_async(cursor=cursor, limit=limit, skip=skip, session=session)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return [
             UserResponse(
                 id=user.id,
@@ -35,6 +41,11 @@ async def get_users(
             )
             for user in users
         ]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -45,11 +56,12 @@ async def get_users(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_claims),
+    session: UnitOfWork = Depends(get_session)
 ):
     """根据ID获取用户信息"""
     try:
-        user = User.get_by_id(user_id)
+        user = await User.get_by_id_async(user_id, session=session)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -83,7 +95,8 @@ async def get_user(
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_data: UserUpdateRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: UnitOfWork = Depends(get_session)
 ):
     """更新当前用户信息"""
     try:
@@ -92,7 +105,7 @@ async def update_current_user(
         
         # 如果更新邮箱，检查是否已被其他用户使用
         if 'email' in update_data and update_data['email'] != current_user.email:
-            existing_user = User.get_by_email(update_data['email'])
+            existing_user = await User.get_by_email_async(update_data['email'], session=session)
             if existing_user and existing_user.id != current_user.id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -101,7 +114,7 @@ async def update_current_user(
         
         # 如果更新手机号，检查是否已被其他用户使用
         if 'phone' in update_data and update_data['phone'] != current_user.phone:
-            existing_user = User.get_by_phone(update_data['phone'])
+            existing_user = await User.get_by_phone_async(update_data['phone'], session=session)
             if existing_user and existing_user.id != current_user.id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -113,7 +126,8 @@ async def update_current_user(
             setattr(current_user, field, value)
         
         # 保存更新
-        current_user.save()
+        await current_user.save_async(session=session)
+        await session.commit()
         
         return UserResponse(
             id=current_user.id,
@@ -144,12 +158,13 @@ async def update_current_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdateRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: UnitOfWork = Depends(get_session)
 ):
     """更新指定用户信息（管理员功能）"""
     try:
         # 这里可以添加管理员权限检查
-        target_user = User.get_by_id(user_id)
+        target_user = await User.get_by_id_async(user_id, session=session)
         if not target_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -161,7 +176,7 @@ async def update_user(
         
         # 检查唯一性约束
         if 'email' in update_data and update_data['email'] != target_user.email:
-            existing_user = User.get_by_email(update_data['email'])
+            existing_user = await User.get_by_email_async(update_data['email'], session=session)
             if existing_user and existing_user.id != user_id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -169,7 +184,7 @@ async def update_user(
                 )
         
         if 'phone' in update_data and update_data['phone'] != target_user.phone:
-            existing_user = User.get_by_phone(update_data['phone'])
+            existing_user = await User.get_by_phone_async(update_data['phone'], session=session)
             if existing_user and existing_user.id != user_id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -181,7 +196,8 @@ async def update_user(
             setattr(target_user, field, value)
         
         # 保存更新
-        target_user.save()
+        await target_user.save_async(session=session)
+        await session.commit()
         
         return UserResponse(
             id=target_user.id,
@@ -211,12 +227,13 @@ async def update_user(
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    session: UnitOfWork = Depends(get_session)
 ):
     """删除用户（管理员功能）"""
     try:
         # 这里可以添加管理员权限检查
-        target_user = User.get_by_id(user_id)
+        target_user = await User.get_by_id_async(user_id, session=session)
         if not target_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -224,7 +241,8 @@ async def delete_user(
             )
         
         # 删除用户
-        User.delete_by_id(user_id)
+        await User.delete_by_id_async(user_id, session=session)
+        await session.commit()
         
         return {"message": "用户删除成功"}
         
@@ -16,7 +16,7 @@ class UserRegisterRequest(BaseModel):
     real_name: str
     gender: Optional[str] = "未知"
     age: Optional[int] = None
-    user_type: str = "passenger"
+    user_type: str = "passenger"  # 保留以兼容旧客户端，注册时忽略，始终创建乘客账户
     
     @validator('username')
     def validate_username(cls, v):
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/25 下午5:03
+# @File    : export.py
+# @Software: PyCharm
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import csv
+import io
+import json
+from app.database.async_database import get_async_database
+
+# 导出批大小：每批从服务端游标读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+ORDER_EXPORT_COLUMNS = [
+    "order_id", "order_number", "user_id", "flight_id", "total_price",
+    "payment_status", "trip_status", "payment_method", "created_at", "updated_at",
+]
+
+FLIGHT_EXPORT_COLUMNS = [
+    "flight_id", "flight_number", "airline", "route_id", "aircraft_id",
+    "departure_time", "arrival_time",
+    "business_price", "economy_price", "first_class_price",
+    "business_seats_available", "economy_seats_available", "first_class_seats_available",
+    "status",
+]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return "" if value is None else value
+
+
+def orders_query(start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[str, Tuple]:
+    """订单导出查询，可按创建日期 [start_date, end_date] 过滤"""
+    query = f"SELECT {', '.join(ORDER_EXPORT_COLUMNS)} FROM orders"
+    conditions, params = [], []
+    if start_date:
+        conditions.append("created_at >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("created_at < %s")
+        params.append(end_date + timedelta(days=1))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY order_id", tuple(params)
+
+
+def flights_query() -> Tuple[str, Tuple]:
+    """航班导出查询"""
+    return f"SELECT {', '.join(FLIGHT_EXPORT_COLUMNS)} FROM flights ORDER BY flight_id", ()
+
+
+async def stream_ndjson(query: str, params: Tuple) -> AsyncIterator[str]:
+    """以 NDJSON（每行一个 JSON 对象）逐批输出查询结果"""
+    async for rows in get_async_database().stream_query(query, params, EXPORT_BATCH_SIZE):
+        yield "".join(
+            json.dumps(row, default=_json_default, ensure_ascii=False) + "\n" for row in rows
+        )
+
+
+async def stream_csv(query: str, params: Tuple, columns: List[str]) -> AsyncIterator[str]:
+    """以 CSV 逐批输出查询结果（带 BOM，便于 Excel 直接打开中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    async for rows in get_async_database().stream_query(query, params, EXPORT_BATCH_SIZE):
+        for row in rows:
+            writer.writerow([_csv_value(row[column]) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_stream(query: str, params: Tuple, columns: List[str], fmt: str) -> Tuple[AsyncIterator[str], Dict[str, str]]:
+    """返回 (内容流, 响应元信息)，fmt 为 ndjson 或 csv"""
+    if fmt == "csv":
+        return stream_csv(query, params, columns), {"media_type": "text/csv; charset=utf-8", "extension": "csv"}
+    return stream_ndjson(query, params), {"media_type": "application/x-ndjson", "extension": "ndjson"}
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/23 上午9:47
+# @File    : flight_search.py
+# @Software: PyCharm
+
+from typing import List, Dict, Any, Tuple
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.database.models import Flight
+
+# 航班搜索结果缓存，键为规范化后的 (出发城市, 到达城市, 日期)，
+# 每条结果以其中的航班ID为标签，余座变化时按航班失效
+search_cache = TTLCache(
+    maxsize=settings.flight_search_cache_size,
+    ttl=settings.flight_search_cache_ttl,
+    name="flight_search",
+)
+
+# 缓存未命中时合并并发的相同搜索，避免缓存过期瞬间的请求洪峰同时打到数据库
+search_group = SingleFlight("flight_search")
+
+
+def normalize_search_key(departure_city: str, arrival_city: str, departure_date: str) -> Tuple[str, str, str]:
+    """规范化搜索条件作为缓存键"""
+    return departure_city.strip(), arrival_city.strip(), departure_date.strip()
+
+
+async def search_flights(departure_city: str, arrival_city: str, departure_date: str) -> List[Dict[str, Any]]:
+    """搜索航班（先查缓存，未命中再查库）"""
+    key = normalize_search_key(departure_city, arrival_city, departure_date)
+    flights = search_cache.get(key)
+    if flights is None:
+        flights = await search_group.do(key, lambda: _load(key))
+    return flights
+
+
+async def _load(key: Tuple[str, str, str]) -> List[Dict[str, Any]]:
+    # 查询期间有航班余座变化时不回填，避免旧余座在缓存中停留整个 TTL
+    since = search_cache.generation()
+    flights = await Flight.search_flight_details_async(*key)
+    search_cache.set(key, flights, tags=[row["flight_id"] for row in flights], since=since)
+    return flights
+
+
+def invalidate_flight(flight_id: int) -> int:
+    """航班余座变化后失效包含该航班的搜索结果"""
+    return search_cache.invalidate_tag(flight_id)
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """搜索缓存命中及请求合并统计"""
+    return {**search_cache.stats(), "coalescing": search_group.stats()}
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/20 下午2:40
+# @File    : inventory.py
+# @Software: PyCharm
+
+from collections import Counter
+from typing import Dict, Iterable, Optional
+import logging
+from app.database.async_database import AsyncDatabase
+from app.services.flight_search import invalidate_flight
+
+logger = logging.getLogger(__name__)
+
+# 舱位与航班余座字段的对应关系
+SEAT_FIELDS = {
+    "经济舱": "economy_seats_available",
+    "商务舱": "business_seats_available",
+    "头等舱": "first_class_seats_available",
+}
+
+
+class InsufficientSeatsError(Exception):
+    """余座不足，事务中已扣减的舱位需由调用方回滚"""
+
+    def __init__(self, flight_id: int, seat_class: str, requested: int,
+                 available: Optional[int], reserved: Dict[str, int]):
+        self.flight_id = flight_id
+        self.seat_class = seat_class
+        self.requested = requested
+        self.available = available
+        self.reserved = reserved
+        if available is None:
+            message = f"航班 {flight_id} 不存在"
+        else:
+            message = f"{seat_class}座位不足：需要 {requested} 个，剩余 {available} 个"
+        super().__init__(message)
+
+
+def count_by_class(seat_classes: Iterable[str]) -> Dict[str, int]:
+    """按舱位统计座位数"""
+    return dict(Counter(seat_classes))
+
+
+def _seat_field(seat_class: str) -> str:
+    field = SEAT_FIELDS.get(seat_class)
+    if field is None:
+        raise ValueError(f"无效的座位类型: {seat_class}")
+    return field
+
+
+async def reserve_seats(db: AsyncDatabase, flight_id: int, seat_counts: Dict[str, int]) -> Dict[str, int]:
+    """扣减座位
+
+    每个舱位只执行一条带余量条件的 UPDATE，余座不足时不会扣成负数。
+    应在订单事务（UnitOfWork）中调用，失败时抛出 InsufficientSeatsError，
+    其中 reserved 记录了本次已扣减的舱位，由事务回滚一并撤销。
+    """
+    reserved: Dict[str, int] = {}
+    for seat_class, count in seat_counts.items():
+        if count <= 0:
+            continue
+        field = _seat_field(seat_class)
+        affected = await db.execute_update(
+            f"UPDATE flights SET {field} = {field} - %s WHERE flight_id = %s AND {field} >= %s",
+            (count, flight_id, count)
+        )
+        if affected == 0:
+            row = await db.execute_one(
+                f"SELECT {field} AS available FROM flights WHERE flight_id = %s", (flight_id,)
+            )
+            available = row["available"] if row else None
+            logger.info(f"航班 {flight_id} {seat_class}扣减失败: 需要 {count}, 剩余 {available}, 已扣减 {reserved}")
+            raise InsufficientSeatsError(flight_id, seat_class, count, available, reserved)
+        reserved[seat_class] = count
+    if reserved:
+        db.after_commit(lambda: invalidate_flight(flight_id))
+    return reserved
+
+
+async def release_seats(db: AsyncDatabase, flight_id: int, seat_counts: Dict[str, int]) -> int:
+    """退还座位，返回实际更新的航班数"""
+    return await release_seats_bulk(db, {flight_id: seat_counts})
+
+
+async def release_seats_bulk(db: AsyncDatabase, seats_by_flight: Dict[int, Dict[str, int]]) -> int:
+    """按航班批量退还座位
+
+    每个航班只执行一条 UPDATE，同时累加各舱位余座；按航班ID顺序加锁，避免并发退座时死锁。
+    返回实际更新的航班数。
+    """
+    released = 0
+    for flight_id in sorted(seats_by_flight):
+        increments = [(_seat_field(seat_class), count)
+                      for seat_class, count in seats_by_flight[flight_id].items() if count > 0]
+        if not increments:
+            continue
+        set_clause = ", ".join(f"{field} = {field} + %s" for field, _ in increments)
+        affected = await db.execute_update(
+            f"UPDATE flights SET {set_clause} WHERE flight_id = %s",
+            tuple(count for _, count in increments) + (flight_id,)
+        )
+        if affected:
+            released += 1
+            db.after_commit(lambda flight_id=flight_id: invalidate_flight(flight_id))
+    return released
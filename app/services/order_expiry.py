@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/24 下午3:02
+# @File    : order_expiry.py
+# @Software: PyCharm
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.database.session import UnitOfWork
+from app.services.inventory import release_seats_bulk
+from app.services.order_state import PAYMENT_PENDING, PAYMENT_CANCELLED
+
+logger = logging.getLogger(__name__)
+
+# 单次运行最多处理的批数，剩余的留到下一次
+MAX_BATCHES_PER_RUN = 50
+
+
+class OrderExpiryWorker:
+    """定时取消超过保留时长仍未支付的订单，并按航班、舱位汇总退还座位
+
+    每批在一个事务中执行：SELECT ... FOR UPDATE 锁定候选订单并复核状态，
+    多个 worker 进程同时运行时不会重复取消或重复退座。
+    """
+
+    def __init__(self, hold_minutes: int, interval: int, batch_size: int):
+        self.hold_minutes = hold_minutes
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        # 在 run_once 中按需创建：Python 3.10 以前 Lock 会绑定创建时的事件循环
+        self._lock: Optional[asyncio.Lock] = None
+        # 统计
+        self.runs = 0
+        self.orders_expired = 0
+        self.seats_released: Counter = Counter()
+        self.flights_updated = 0
+        self.errors = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_expired = 0
+        self.last_error: Optional[str] = None
+
+    async def expire_batch(self, cutoff: datetime) -> int:
+        """取消一批过期订单，返回本批取消的订单数"""
+        async with UnitOfWork() as session:
+            rows = await session.execute_query(
+                """
+                SELECT order_id FROM orders
+                WHERE payment_status = %s AND created_at < %s
+                ORDER BY created_at
+                LIMIT %s
+                FOR UPDATE
+                """,
+                (PAYMENT_PENDING, cutoff, self.batch_size)
+            )
+            if not rows:
+                return 0
+            order_ids = tuple(row["order_id"] for row in rows)
+            placeholders = ", ".join(["%s"] * len(order_ids))
+
+            seat_rows = await session.execute_query(
+                f"""
+                SELECT o.flight_id, p.seat_class, COUNT(*) AS seats
+                FROM orders o JOIN order_passengers p ON p.order_id = o.order_id
+                WHERE o.order_id IN ({placeholders})
+                GROUP BY o.flight_id, p.seat_class
+                """,
+                order_ids
+            )
+            expired = await session.execute_update(
+                f"UPDATE orders SET payment_status = %s WHERE order_id IN ({placeholders}) AND payment_status = %s",
+                (PAYMENT_CANCELLED,) + order_ids + (PAYMENT_PENDING,)
+            )
+
+            seats_by_flight: Dict[int, Dict[str, int]] = {}
+            for row in seat_rows:
+                seats_by_flight.setdefault(row["flight_id"], {})[row["seat_class"]] = row["seats"]
+            flights = await release_seats_bulk(session, seats_by_flight)
+
+        # 事务已提交，再计入统计
+        self.orders_expired += expired
+        self.flights_updated += flights
+        for row in seat_rows:
+            self.seats_released[row["seat_class"]] += row["seats"]
+        return expired
+
+    async def run_once(self) -> int:
+        """处理所有到期订单（单次最多 MAX_BATCHES_PER_RUN 批），返回取消的订单数"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            started = time.perf_counter()
+            cutoff = datetime.now() - timedelta(minutes=self.hold_minutes)
+            total = 0
+            try:
+                for _ in range(MAX_BATCHES_PER_RUN):
+                    expired = await self.expire_batch(cutoff)
+                    total += expired
+                    if expired < self.batch_size:
+                        break
+                self.last_error = None
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                logger.error(f"过期订单处理失败: {e}")
+            finally:
+                self.runs += 1
+                self.last_run_at = datetime.now()
+                self.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+                self.last_expired = total
+            if total:
+                logger.info(f"已取消 {total} 个超时未支付订单")
+            return total
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    def start(self) -> None:
+        """启动定时任务"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止定时任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "hold_minutes": self.hold_minutes,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "orders_expired": self.orders_expired,
+            "seats_released": dict(self.seats_released),
+            "flights_updated": self.flights_updated,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_expired": self.last_expired,
+            "last_error": self.last_error,
+        }
+
+
+# 创建全局过期处理实例
+order_expiry = OrderExpiryWorker(
+    hold_minutes=settings.order_hold_minutes,
+    interval=settings.order_expiry_interval,
+    batch_size=settings.order_expiry_batch_size,
+)
+
+
+def get_order_expiry() -> OrderExpiryWorker:
+    """获取订单过期处理实例"""
+    return order_expiry
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/24 上午10:15
+# @File    : order_state.py
+# @Software: PyCharm
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import logging
+from app.database.async_database import AsyncDatabase
+from app.services.inventory import release_seats
+
+logger = logging.getLogger(__name__)
+
+# 订单状态取值（与 orders 表的 ENUM 一致）
+PAYMENT_PENDING = "待支付"
+PAYMENT_PAID = "已支付"
+PAYMENT_CANCELLED = "已取消"
+TRIP_WAITING = "待值机"
+
+
+class Transition(NamedTuple):
+    """订单状态迁移：允许的起始状态和迁移后写入的列"""
+    name: str
+    from_payment: Tuple[str, ...]
+    from_trip: Optional[Tuple[str, ...]]
+    updates: Dict[str, Any]
+    releases_seats: bool = False
+
+
+PAY = Transition("pay", (PAYMENT_PENDING,), None, {"payment_status": PAYMENT_PAID})
+CANCEL = Transition(
+    "cancel", (PAYMENT_PENDING, PAYMENT_PAID), (TRIP_WAITING,),
+    {"payment_status": PAYMENT_CANCELLED}, releases_seats=True
+)
+
+
+class OrderTransitionError(Exception):
+    """状态迁移未生效，reason 为 not_found / forbidden / invalid_state"""
+
+    def __init__(self, reason: str, transition: Transition, order: Optional[Dict[str, Any]] = None):
+        self.reason = reason
+        self.transition = transition
+        self.order = order
+        super().__init__(f"订单状态迁移 {transition.name} 失败: {reason}")
+
+
+def _build_update(transition: Transition, order_id: int, user_id: Optional[int],
+                  extra: Optional[Dict[str, Any]]) -> Tuple[str, Tuple]:
+    updates = {**transition.updates, **(extra or {})}
+    set_clause = ", ".join(f"{field} = %s" for field in updates)
+    params = list(updates.values())
+
+    where = ["order_id = %s"]
+    params.append(order_id)
+    if user_id is not None:
+        where.append("user_id = %s")
+        params.append(user_id)
+    where.append(f"payment_status IN ({', '.join(['%s'] * len(transition.from_payment))})")
+    params.extend(transition.from_payment)
+    if transition.from_trip:
+        where.append(f"trip_status IN ({', '.join(['%s'] * len(transition.from_trip))})")
+        params.extend(transition.from_trip)
+    return f"UPDATE orders SET {set_clause} WHERE {' AND '.join(where)}", tuple(params)
+
+
+async def _diagnose(db: AsyncDatabase, transition: Transition, order_id: int, user_id: Optional[int]) -> OrderTransitionError:
+    """迁移未命中时查出原因（只在失败路径上多一次查询）"""
+    order = await db.execute_one(
+        "SELECT order_id, user_id, payment_status, trip_status FROM orders WHERE order_id = %s",
+        (order_id,)
+    )
+    if order is None:
+        return OrderTransitionError("not_found", transition)
+    if user_id is not None and order["user_id"] != user_id:
+        return OrderTransitionError("forbidden", transition, order)
+    return OrderTransitionError("invalid_state", transition, order)
+
+
+async def apply_transition(db: AsyncDatabase, transition: Transition, order_id: int,
+                           user_id: Optional[int] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+    """执行一次条件更新，命中 0 行时抛出 OrderTransitionError
+
+    起始状态、订单归属都写在 WHERE 中，并发的重复请求只有一个能命中。
+    user_id 为 None 时不校验归属（系统任务使用）。
+    """
+    query, params = _build_update(transition, order_id, user_id, extra)
+    if await db.execute_update(query, params) == 0:
+        raise await _diagnose(db, transition, order_id, user_id)
+
+
+async def pay(db: AsyncDatabase, order_id: int, user_id: Optional[int] = None) -> None:
+    """支付：待支付 -> 已支付"""
+    await apply_transition(db, PAY, order_id, user_id)
+
+
+async def cancel(db: AsyncDatabase, order_id: int, user_id: Optional[int] = None) -> Dict[str, int]:
+    """取消：未值机的订单 -> 已取消，并在同一事务中退还座位，返回各舱位退还数
+
+    应在工作单元中调用；订单行在更新后被锁定，重复取消不会重复退座。
+    """
+    await apply_transition(db, CANCEL, order_id, user_id)
+    rows = await db.execute_query(
+        """
+        SELECT o.flight_id, p.seat_class, COUNT(*) AS seats
+        FROM orders o JOIN order_passengers p ON p.order_id = o.order_id
+        WHERE o.order_id = %s
+        GROUP BY o.flight_id, p.seat_class
+        """,
+        (order_id,)
+    )
+    if not rows:
+        return {}
+    seat_counts = {row["seat_class"]: row["seats"] for row in rows}
+    await release_seats(db, rows[0]["flight_id"], seat_counts)
+    return seat_counts
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/25 下午4:18
+# @File    : password_hasher.py
+# @Software: PyCharm
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import sys
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class PasswordHasherBusy(Exception):
+    """排队中的哈希任务已达上限"""
+
+
+def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES
+    )
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def hash_password(password: str, n: int, r: int, p: int) -> str:
+    """计算密码哈希，格式 scrypt$n$r$p$盐$哈希（在子进程中执行）"""
+    salt = os.urandom(SALT_BYTES)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_derive(password, salt, n, r, p))}"
+
+
+def verify_hash(password: str, encoded: str) -> bool:
+    """校验密码与哈希是否匹配（在子进程中执行）"""
+    try:
+        _, n, r, p, salt, expected = encoded.split("$")
+        derived = _derive(password, base64.b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived, base64.b64decode(expected))
+    except (ValueError, TypeError):
+        return False
+
+
+def _parse_params(encoded: str) -> Optional[Tuple[int, int, int]]:
+    """取出哈希的代价参数，不是本方案的哈希（历史明文）时返回 None"""
+    parts = encoded.split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+class PasswordHasher:
+    """在独立进程池中计算 scrypt 密码哈希，不阻塞事件循环
+
+    每个 worker 进程各自持有一个进程池；排队任务超过 max_pending 时直接拒绝（PasswordHasherBusy），
+    避免登录洪峰把请求堆积在池前。历史明文密码在进程内比对，校验通过后提示调用方升级。
+    """
+
+    def __init__(self, workers: int, max_pending: int, n: int, r: int, p: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.params = (n, r, p)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+        # 统计
+        self.hashes = 0
+        self.verifications = 0
+        self.plaintext_verifications = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 按进程创建；用 spawn 启动子进程，避免 fork 带着事件循环和连接池的状态
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._executor_pid = pid
+        return self._executor
+
+    async def _run(self, func, *args) -> Any:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("密码校验请求过多，请稍后重试")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """计算新密码的哈希"""
+        self.hashes += 1
+        return await self._run(hash_password, password, *self.params)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """存储值是明文或代价参数与当前配置不同"""
+        return _parse_params(stored) != self.params
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """校验密码，返回 (是否匹配, 需要写回的新哈希)
+
+        存储值是明文或使用旧代价参数时，校验通过后返回按当前配置计算的新哈希，由调用方保存。
+        """
+        if not stored:
+            return False, None
+        if _parse_params(stored) is None:
+            # 历史明文密码
+            self.plaintext_verifications += 1
+            if not hmac.compare_digest(password.encode(), stored.encode()):
+                return False, None
+        else:
+            self.verifications += 1
+            if not await self._run(verify_hash, password, stored):
+                return False, None
+        if self.needs_rehash(stored):
+            return True, await self.hash(password)
+        return True, None
+
+    async def verify_dummy(self, password: str) -> None:
+        """用户不存在时按当前参数做一次同等代价的校验，使响应耗时与真实账户一致"""
+        await self.warm_up()
+        self.verifications += 1
+        await self._run(verify_hash, password, self._dummy_hash)
+
+    async def warm_up(self) -> None:
+        """启动子进程并预先计算占位哈希，避免首个请求承担这部分耗时"""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self._run(hash_password, "dummy-password", *self.params)
+
+    def shutdown(self) -> None:
+        """关闭进程池（不等待排队中的任务）"""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            if sys.version_info >= (3, 9):
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                # Python 3.8 不支持 cancel_futures
+                self._executor.shutdown(wait=False)
+        self._executor = None
+        self._executor_pid = None
+
+    def stats(self) -> Dict[str, Any]:
+        n, r, p = self.params
+        return {
+            "scheme": SCHEME,
+            "n": n,
+            "r": r,
+            "p": p,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "hashes": self.hashes,
+            "verifications": self.verifications,
+            "plaintext_verifications": self.plaintext_verifications,
+            "rejected": self.rejected,
+        }
+
+
+# 创建全局密码哈希实例
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    n=settings.password_hash_n,
+    r=settings.password_hash_r,
+    p=settings.password_hash_p,
+)
+
+
+def get_password_hasher() -> PasswordHasher:
+    """获取密码哈希服务实例"""
+    return password_hasher
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# @Author  : Xingjian Li
+# @Time    : 2025/7/25 上午10:40
+# @File    : token_revocation.py
+# @Software: PyCharm
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import time
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.database.async_database import AsyncDatabase, get_async_database
+
+logger = logging.getLogger(__name__)
+
+# 增量同步时回看的时长，覆盖提交较晚的吊销记录（revoked_at 只精确到秒）
+SYNC_OVERLAP = timedelta(seconds=60)
+# 单条 DELETE 清理的最大行数
+PRUNE_BATCH_SIZE = 1000
+
+
+class TokenRevocationList:
+    """已吊销令牌（按 jti）：MySQL revoked_tokens 表持久化，内存中用布隆过滤器 + 精确集合判断
+
+    认证热路径只查内存：布隆过滤器判定不存在（绝大多数请求）直接放行，可能存在时再查精确集合。
+    本进程吊销立即生效；其他 worker 进程的吊销按 revoked_at 增量同步，最迟 sync_interval 秒后生效。
+    过期的令牌本身已无法通过验证，其吊销记录定期从内存和表中清理。
+    """
+
+    def __init__(self, sync_interval: int, prune_interval: int, capacity: int):
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self.capacity = capacity
+        self._expires: Dict[str, float] = {}  # jti -> 令牌过期时间戳
+        self._bloom = BloomFilter(capacity)
+        self._watermark: Optional[datetime] = None
+        self._last_prune = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        # 统计
+        self.checks = 0
+        self.bloom_rejects = 0
+        self.false_positives = 0
+        self.revoked_hits = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.pruned = 0
+        self.last_sync_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def is_revoked(self, jti: str) -> bool:
+        """令牌是否已吊销（只查内存）"""
+        self.checks += 1
+        if jti not in self._bloom:
+            self.bloom_rejects += 1
+            return False
+        if jti not in self._expires:
+            self.false_positives += 1
+            return False
+        self.revoked_hits += 1
+        return True
+
+    def _add(self, jti: str, expires_at: float) -> None:
+        if jti in self._expires:
+            return
+        self._expires[jti] = expires_at
+        self._bloom.add(jti)
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """按剩余条目重建布隆过滤器，条目超出容量时扩容"""
+        capacity = max(self.capacity, len(self._expires) * 2)
+        self._bloom = BloomFilter.from_items(self._expires, capacity)
+
+    async def revoke(self, jti: str, user_id: int, expires_at: float,
+                     session: Optional[AsyncDatabase] = None) -> None:
+        """吊销令牌；在工作单元中调用时提交后才加入内存"""
+        db = session if session is not None else get_async_database()
+        await db.execute_update(
+            "INSERT IGNORE INTO revoked_tokens (jti, user_id, expires_at) VALUES (%s, %s, %s)",
+            (jti, user_id, datetime.fromtimestamp(expires_at))
+        )
+        db.after_commit(lambda: self._add(jti, expires_at))
+
+    async def sync(self) -> int:
+        """从表中拉取上次同步以来新增的吊销记录，首次同步加载全部未过期记录，返回新增数"""
+        query = "SELECT jti, expires_at, revoked_at FROM revoked_tokens WHERE expires_at > %s"
+        params = [datetime.now()]
+        if self._watermark is not None:
+            query += " AND revoked_at >= %s"
+            params.append(self._watermark - SYNC_OVERLAP)
+        rows = await get_async_database().execute_query(query, tuple(params))
+
+        before = len(self._expires)
+        for row in rows:
+            self._add(row["jti"], row["expires_at"].timestamp())
+            if row["revoked_at"] is not None and (self._watermark is None or row["revoked_at"] > self._watermark):
+                self._watermark = row["revoked_at"]
+        self.syncs += 1
+        self.last_sync_at = datetime.now()
+        return len(self._expires) - before
+
+    async def prune(self) -> int:
+        """清理已过期的吊销记录（内存和表），返回清理的内存条目数"""
+        now = time.time()
+        expired = [jti for jti, expires_at in self._expires.items() if expires_at <= now]
+        for jti in expired:
+            del self._expires[jti]
+        if expired:
+            self._rebuild()
+            self.pruned += len(expired)
+
+        cutoff = datetime.fromtimestamp(now)
+        while True:
+            deleted = await get_async_database().execute_update(
+                "DELETE FROM revoked_tokens WHERE expires_at < %s LIMIT %s",
+                (cutoff, PRUNE_BATCH_SIZE)
+            )
+            if deleted < PRUNE_BATCH_SIZE:
+                break
+        self._last_prune = time.monotonic()
+        return len(expired)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    await self.prune()
+                self.last_error = None
+            except Exception as e:
+                # 同步失败时继续使用内存中的数据
+                self.sync_errors += 1
+                self.last_error = str(e)
+                logger.error(f"吊销令牌同步失败: {e}")
+
+    async def start(self) -> None:
+        """加载未过期的吊销记录并启动定时同步"""
+        try:
+            await self.sync()
+        except Exception as e:
+            self.sync_errors += 1
+            self.last_error = str(e)
+            logger.error(f"吊销令牌加载失败，将在下次同步时重试: {e}")
+        if self.sync_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止定时同步"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "revoked": len(self._expires),
+            "bloom": self._bloom.stats(),
+            "checks": self.checks,
+            "bloom_rejects": self.bloom_rejects,
+            "false_positives": self.false_positives,
+            "revoked_hits": self.revoked_hits,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "pruned": self.pruned,
+            "last_sync_at": self.last_sync_at,
+            "watermark": self._watermark,
+            "last_error": self.last_error,
+        }
+
+
+# 创建全局吊销列表实例
+token_revocation = TokenRevocationList(
+    sync_interval=settings.token_revocation_sync_interval,
+    prune_interval=settings.token_revocation_prune_interval,
+    capacity=settings.token_revocation_capacity,
+)
+
+
+def get_token_revocation() -> TokenRevocationList:
+    """获取已吊销令牌列表实例"""
+    return token_revocation
@@ -0,0 +1,133 @@
+"""
+数据库结构版本迁移
+
+已执行的版本记录在 schema_migrations 表中，重复运行只会执行尚未执行的版本。
+
+用法：
+    python database_configure/migrate.py           # 执行所有待执行的迁移
+    python database_configure/migrate.py --status  # 查看迁移状态
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import get_database
+from app.database.schema import EXPECTED_INDEXES, get_existing_indexes
+
+db = get_database()
+
+
+def create_index(table, index_name, columns):
+    """创建索引（已存在则跳过，MySQL 不支持 CREATE INDEX IF NOT EXISTS）"""
+    if index_name in get_existing_indexes(table):
+        print(f"  - 索引 {table}.{index_name} 已存在，跳过")
+        return
+    db.execute_update(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+    print(f"  ✅ 已创建索引 {table}.{index_name}")
+
+
+def create_indexes(*index_names):
+    """按名称创建 EXPECTED_INDEXES 中定义的索引"""
+    specs = {index_name: (table, columns) for table, index_name, columns in EXPECTED_INDEXES}
+    for index_name in index_names:
+        table, columns = specs[index_name]
+        create_index(table, index_name, columns)
+
+
+def migration_001_query_indexes():
+    """航班搜索、用户订单列表、订单乘客查询所需的复合索引"""
+    create_indexes(
+        "idx_flights_route_status_departure",
+        "idx_orders_user_created",
+        "idx_order_passengers_order",
+    )
+
+
+def migration_002_listing_indexes():
+    """航班、用户列表游标分页所需的排序索引"""
+    create_indexes("idx_flights_departure", "idx_users_created")
+
+
+def migration_003_order_expiry_index():
+    """超时未支付订单扫描所需的索引"""
+    create_indexes("idx_orders_payment_created")
+
+
+def migration_004_revoked_tokens():
+    """已吊销令牌表（登出）及同步、清理所需的索引"""
+    db.execute_update(
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+          jti CHAR(32) PRIMARY KEY,
+          user_id INT NOT NULL,
+          expires_at DATETIME NOT NULL,
+          revoked_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    create_indexes("idx_revoked_tokens_revoked", "idx_revoked_tokens_expires")
+
+
+def migration_005_user_login_indexes():
+    """按邮箱、手机号登录及注册查重所需的索引"""
+    create_indexes("idx_users_email", "idx_users_phone")
+
+
+# 按版本号顺序排列，已发布的版本不要修改，新变更追加新版本
+MIGRATIONS = [
+    (1, migration_001_query_indexes),
+    (2, migration_002_listing_indexes),
+    (3, migration_003_order_expiry_index),
+    (4, migration_004_revoked_tokens),
+    (5, migration_005_user_login_indexes),
+]
+
+
+def ensure_migrations_table():
+    db.execute_update(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version INT PRIMARY KEY,
+          description VARCHAR(255) NOT NULL,
+          applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def get_applied_versions():
+    return {row["version"] for row in db.execute_query("SELECT version FROM schema_migrations")}
+
+
+def migrate():
+    """执行所有待执行的迁移"""
+    ensure_migrations_table()
+    applied = get_applied_versions()
+    pending = [(version, func) for version, func in MIGRATIONS if version not in applied]
+    if not pending:
+        print("✅ 数据库结构已是最新版本")
+        return
+
+    for version, func in pending:
+        description = func.__doc__.strip()
+        print(f"执行迁移 {version:03d}: {description}")
+        func()
+        db.insert("schema_migrations", {"version": version, "description": description})
+    print(f"🎉 共执行 {len(pending)} 个迁移")
+
+
+def show_status():
+    """查看迁移状态"""
+    ensure_migrations_table()
+    applied = get_applied_versions()
+    for version, func in MIGRATIONS:
+        mark = "✅" if version in applied else "⏳"
+        print(f"{mark} {version:03d}: {func.__doc__.strip()}")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        show_status()
+    else:
+        migrate()
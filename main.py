@@ -2,9 +2,16 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.routers import users, flights, orders, auth, notices
+from app.routers import users, flights, orders, auth, notices, admin
 from app.core.config import settings
-from app.database.connection import test_database_connection, get_database_info
+from app.database.connection import test_database_connection, get_database_info, close_database_connections
+from app.database.async_database import init_async_database, close_async_database
+from app.database.schema import check_indexes
+from app.database.reference_data import get_reference_cache
+from app.database.query_stats import QueryRouteMiddleware
+from app.services.order_expiry import get_order_expiry
+from app.services.token_revocation import get_token_revocation
+from app.services.password_hasher import get_password_hasher
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -25,15 +32,45 @@ async def lifespan(app: FastAPI):
         logger.info(f"   数据库: {db_info['database_name']}")
         logger.info(f"   版本: {db_info['version']}")
         logger.info(f"   表数量: {db_info['table_count']}")
+        
+        # 检查热点查询所需的索引
+        check_indexes()
     else:
         logger.error("❌ 数据库连接失败")
         logger.error("请检查数据库配置和连接信息")
         logger.error("可以尝试运行: python init_database.py")
     
+    # 初始化异步连接池（失败时在首次请求时重试）
+    try:
+        await init_async_database()
+    except Exception as e:
+        logger.error(f"❌ 异步连接池初始化失败: {e}")
+    
+    # 加载航线/机型参考数据并定时刷新
+    await get_reference_cache().start()
+    
+    # 定时取消超时未支付订单并退还座位
+    get_order_expiry().start()
+    
+    # 加载已吊销令牌并定时同步其他进程的吊销记录
+    await get_token_revocation().start()
+    
+    # 启动密码哈希进程池
+    try:
+        await get_password_hasher().warm_up()
+    except Exception as e:
+        logger.error(f"密码哈希进程池启动失败: {e}")
+    
     yield
     
     # 关闭时执行
     logger.info("正在关闭蓝天航空票务系统...")
+    await get_token_revocation().stop()
+    get_password_hasher().shutdown()
+    await get_order_expiry().stop()
+    await get_reference_cache().stop()
+    await close_async_database()
+    close_database_connections()
 
 
 app = FastAPI(
@@ -51,8 +88,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # 游标分页的下一页游标
 )
 
+# 记录当前请求，供查询统计按路由模板归类
+app.add_middleware(QueryRouteMiddleware)
 
 
 # 注册路由
@@ -61,6 +101,7 @@ app.include_router(users.router, prefix="/api/users", tags=["用户"])
 app.include_router(flights.router, prefix="/api/flights", tags=["航班"])
 app.include_router(orders.router, prefix="/api/orders", tags=["订单"])
 app.include_router(notices.router, prefix="/api/notices", tags=["通知"])
+app.include_router(admin.router, prefix="/api/admin", tags=["管理"])
 
 
 @app.get("/")